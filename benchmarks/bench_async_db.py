@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark: synchronous Session vs AsyncSession inside async handlers.
+
+Seeds a temporary SQLite database through the API models, then serves the
+comments ownership query (the 4-table join) from two small FastAPI apps: one
+that uses a synchronous Session inside ``async def`` handlers (the old
+behaviour) and one that uses the async engine (the current behaviour). While
+slow requests are in flight, cheap probe requests measure how long the event
+loop keeps other requests waiting.
+
+``--query count`` aggregates over the join, so the time is spent waiting on
+the database. ``--query rows`` loads every comment as an ORM object, where
+most of the time is spent hydrating rows on the event loop thread and the
+async engine cannot help. SQLite runs queries in-process, so keep ``--slow``
+at or below the number of CPU cores; beyond that the queries saturate the CPU
+whichever session type is used.
+
+Usage:
+    python benchmarks/bench_async_db.py --documents 20000 --query count --slow 2 --probes 40 --interval 0.01
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+DB_DIR = tempfile.mkdtemp(prefix="bench_async_db_")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_DIR}/bench.db"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from stream_agent.api.database import Base, SessionLocal, async_engine, engine, get_db
+from stream_agent.api.models import (
+    User as UserModel, Subreddit as SubredditModel, Run as RunModel,
+    Document as DocumentModel, AIGeneratedComment as CommentModel
+)
+
+
+def seed(documents: int):
+    """Create one user with `documents` documents, each with one comment."""
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user_id = str(uuid.uuid4())
+        db.add(UserModel(id=user_id, username="bench", email="bench@example.com", hashed_password="x"))
+        subreddit_id = str(uuid.uuid4())
+        db.add(SubredditModel(
+            id=subreddit_id, subreddit="bench", time_range="TODAY", limit=100, target_number=10,
+            audience_specification="", subreddit_description="", owner_id=user_id
+        ))
+        run_ids = [str(uuid.uuid4()) for _ in range(max(1, documents // 10))]
+        db.add_all([RunModel(id=run_id, name=run_id, subreddit_id=subreddit_id, owner_id=user_id) for run_id in run_ids])
+        db.flush()
+        for i in range(documents):
+            doc_id = str(uuid.uuid4())
+            db.add(DocumentModel(
+                id=doc_id, title=f"post {i}", content="body " * 50, content_hash=doc_id,
+                run_id=run_ids[i % len(run_ids)], owner_id=user_id
+            ))
+            db.add(CommentModel(id=str(uuid.uuid4()), content="comment", tone="Casual", document_id=doc_id, owner_id=user_id))
+        db.commit()
+    return user_id
+
+
+def comments_query(user_id: str, query: str):
+    columns = func.count(func.distinct(CommentModel.content + DocumentModel.content)) if query == "count" else CommentModel
+    return select(columns).select_from(CommentModel).join(DocumentModel).join(RunModel).join(SubredditModel).where(
+        SubredditModel.owner_id == user_id
+    )
+
+
+def build_sync_app(user_id: str, query: str) -> FastAPI:
+    app = FastAPI()
+
+    def get_sync_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/comments/")
+    async def comments(db: Session = Depends(get_sync_db)):
+        return {"rows": len(db.execute(comments_query(user_id, query)).scalars().all())}
+
+    @app.get("/probe")
+    async def probe(db: Session = Depends(get_sync_db)):
+        return {"users": db.execute(select(func.count()).select_from(UserModel)).scalar()}
+
+    return app
+
+
+def build_async_app(user_id: str, query: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/comments/")
+    async def comments(db=Depends(get_db)):
+        result = await db.execute(comments_query(user_id, query))
+        return {"rows": len(result.scalars().all())}
+
+    @app.get("/probe")
+    async def probe(db=Depends(get_db)):
+        return {"users": await db.scalar(select(func.count()).select_from(UserModel))}
+
+    return app
+
+
+async def timed_get(client: httpx.AsyncClient, path: str, scheduled: float = None) -> float:
+    """Issue a GET and return its latency, measured from `scheduled` when given."""
+    start = time.perf_counter() if scheduled is None else scheduled
+    response = await client.get(path)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def measure(app: FastAPI, slow: int, probes: int, interval: float) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up connections
+        await timed_get(client, "/probe")
+
+        start = time.perf_counter()
+        slow_tasks = [asyncio.create_task(timed_get(client, "/comments/")) for _ in range(slow)]
+
+        # Probes are scheduled at fixed times; a blocked event loop makes them late
+        probe_tasks = []
+        for i in range(probes):
+            scheduled = start + i * interval
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            probe_tasks.append(asyncio.create_task(timed_get(client, "/probe", scheduled)))
+
+        slow_latencies = await asyncio.gather(*slow_tasks)
+        probe_latencies = sorted(await asyncio.gather(*probe_tasks))
+        wall = time.perf_counter() - start
+
+    await async_engine.dispose()
+    return {
+        "wall_s": wall,
+        "slow_max_s": max(slow_latencies),
+        "probe_p50_ms": statistics.median(probe_latencies) * 1000,
+        "probe_p95_ms": probe_latencies[max(0, int(len(probe_latencies) * 0.95) - 1)] * 1000,
+        "probe_max_ms": probe_latencies[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20000, help="Documents (and comments) to seed")
+    parser.add_argument("--query", choices=["count", "rows"], default="count", help="Slow query to run")
+    parser.add_argument("--slow", type=int, default=2, help="Concurrent slow requests")
+    parser.add_argument("--probes", type=int, default=40, help="Probe requests issued meanwhile")
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between probe requests")
+    args = parser.parse_args()
+
+    print(f"Seeding {args.documents} documents into {DB_DIR}...")
+    user_id = seed(args.documents)
+
+    with SessionLocal() as db:
+        db.execute(text("ANALYZE"))
+
+    results = {
+        "sync Session (before)": asyncio.run(measure(build_sync_app(user_id, args.query), args.slow, args.probes, args.interval)),
+        "AsyncSession (after)": asyncio.run(measure(build_async_app(user_id, args.query), args.slow, args.probes, args.interval)),
+    }
+
+    print(f"\n{args.slow} concurrent /comments/ requests (--query {args.query}), one probe every {args.interval * 1000:.0f} ms meanwhile\n")
+    print(f"{'mode':<24}{'wall s':>10}{'slow max s':>12}{'probe p50 ms':>15}{'probe p95 ms':>15}{'probe max ms':>15}")
+    for mode, r in results.items():
+        print(f"{mode:<24}{r['wall_s']:>10.2f}{r['slow_max_s']:>12.2f}"
+              f"{r['probe_p50_ms']:>15.1f}{r['probe_p95_ms']:>15.1f}{r['probe_max_ms']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
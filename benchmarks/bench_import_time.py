@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the API.
+
+Imports stream_agent.api.main in fresh interpreters under `python -X importtime`
+and reports the median cumulative import time and the heaviest imports it
+pulls in. Every uvicorn worker and container pays this before serving its
+first request. The script exits with status 1 if the median exceeds
+--budget-ms, or if any of the --forbid packages is imported: the pipeline's
+LLM and Arcade clients are loaded on the first run, and alembic only when the
+app migrates the database on startup.
+
+Usage:
+    python benchmarks/bench_import_time.py --repeat 5 --budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE = "stream_agent.api.main"
+FORBIDDEN = ["langchain", "langchain_core", "langchain_openai", "langchain_anthropic", "arcadepy", "alembic"]
+
+
+def import_times(module: str) -> dict:
+    """Cumulative import time in microseconds of every module imported by a fresh interpreter importing module."""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp(prefix='bench_import_time_')}/import.db"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+    # Lines look like "import time:   self [us] | cumulative | imported package", nested by indentation
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(cumulative), depth)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Maximum median import time of the API")
+    parser.add_argument("--forbid", nargs="*", default=FORBIDDEN, help="Packages the API must not import")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest direct imports to list")
+    args = parser.parse_args()
+
+    runs = [import_times(MODULE) for _ in range(args.repeat)]
+    totals = sorted(run[MODULE][0] / 1000 for run in runs)
+    median = statistics.median(totals)
+    median_run = min(runs, key=lambda run: abs(run[MODULE][0] / 1000 - median))
+
+    print(f"import {MODULE}: median {median:.0f} ms, min {totals[0]:.0f} ms, max {totals[-1]:.0f} ms "
+          f"over {args.repeat} interpreters\n")
+    # The modules imported directly by the API's own imports, heaviest first
+    direct = sorted(
+        ((us, name) for name, (us, depth) in median_run.items() if depth == 1),
+        reverse=True
+    )
+    print(f"{'heaviest imports':<48}{'ms':>8}")
+    for us, name in direct[:args.top]:
+        print(f"{name:<48}{us / 1000:>8.1f}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median import time {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    imported = sorted(package for package in args.forbid if package in median_run)
+    if imported:
+        failures.append(f"imports {', '.join(imported)}, which should load on first use")
+
+    if failures:
+        for failure in failures:
+            print(f"\nFAIL: {failure}")
+        sys.exit(1)
+    print(f"\nOK: within the {args.budget_ms:.0f} ms budget and none of {', '.join(args.forbid)} imported")
+
+
+if __name__ == "__main__":
+    main()
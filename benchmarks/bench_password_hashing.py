@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark: bcrypt on the event loop vs on the password hashing pool.
+
+Serves a login-style endpoint that verifies a bcrypt hash from two small
+FastAPI apps: one calls passlib inline inside the ``async def`` handler (the
+old behaviour) and one awaits ``verify_and_update_password_async`` (the
+current behaviour). While a burst of logins is in flight, cheap probe
+requests scheduled at fixed times measure how long the event loop keeps the
+worker's other requests waiting.
+
+Usage:
+    BCRYPT_ROUNDS=12 python benchmarks/bench_password_hashing.py --logins 8 --probes 100 --interval 0.01
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from fastapi import FastAPI
+
+from stream_agent.api.auth import (
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, get_password_hash, verify_password,
+    verify_and_update_password_async
+)
+
+PASSWORD = "correct horse battery staple"
+
+
+def build_inline_app(hashed_password: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        return {"ok": verify_password(PASSWORD, hashed_password)}
+
+    @app.get("/probe")
+    async def probe():
+        return {"status": "alive"}
+
+    return app
+
+
+def build_pool_app(hashed_password: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        verified, _ = await verify_and_update_password_async(PASSWORD, hashed_password)
+        return {"ok": verified}
+
+    @app.get("/probe")
+    async def probe():
+        return {"status": "alive"}
+
+    return app
+
+
+async def timed(client: httpx.AsyncClient, method: str, path: str, scheduled: float = None) -> float:
+    """Issue a request and return its latency, measured from `scheduled` when given."""
+    start = time.perf_counter() if scheduled is None else scheduled
+    response = await client.request(method, path)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def measure(app: FastAPI, logins: int, probes: int, interval: float) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        login_tasks = [asyncio.create_task(timed(client, "POST", "/login")) for _ in range(logins)]
+
+        # Probes are scheduled at fixed times; a blocked event loop makes them late
+        probe_tasks = []
+        for i in range(probes):
+            scheduled = start + i * interval
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            probe_tasks.append(asyncio.create_task(timed(client, "GET", "/probe", scheduled)))
+
+        login_latencies = await asyncio.gather(*login_tasks)
+        probe_latencies = sorted(await asyncio.gather(*probe_tasks))
+        wall = time.perf_counter() - start
+
+    return {
+        "wall_s": wall,
+        "login_max_s": max(login_latencies),
+        "probe_p50_ms": statistics.median(probe_latencies) * 1000,
+        "probe_p95_ms": probe_latencies[max(0, int(len(probe_latencies) * 0.95) - 1)] * 1000,
+        "probe_max_ms": probe_latencies[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=8, help="Concurrent login requests")
+    parser.add_argument("--probes", type=int, default=100, help="Probe requests issued meanwhile")
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between probe requests")
+    args = parser.parse_args()
+
+    hashed_password = get_password_hash(PASSWORD)
+
+    results = {
+        "inline (before)": asyncio.run(measure(build_inline_app(hashed_password), args.logins, args.probes, args.interval)),
+        "hashing pool (after)": asyncio.run(measure(build_pool_app(hashed_password), args.logins, args.probes, args.interval)),
+    }
+
+    print(f"\n{args.logins} concurrent logins at bcrypt cost {BCRYPT_ROUNDS} ({PASSWORD_HASH_WORKERS} pool workers), "
+          f"one probe every {args.interval * 1000:.0f} ms meanwhile\n")
+    print(f"{'mode':<24}{'wall s':>10}{'login max s':>13}{'probe p50 ms':>15}{'probe p95 ms':>15}{'probe max ms':>15}")
+    for mode, r in results.items():
+        print(f"{mode:<24}{r['wall_s']:>10.2f}{r['login_max_s']:>13.2f}"
+              f"{r['probe_p50_ms']:>15.1f}{r['probe_p95_ms']:>15.1f}{r['probe_max_ms']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
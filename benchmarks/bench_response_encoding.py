@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Payload size and latency benchmark for GET /runs/{run_id} response encoding.
+
+Seeds a temporary database with one run of Reddit-sized documents, then serves
+the run-with-documents payload from two small FastAPI apps: one with FastAPI's
+default JSONResponse and no compression (the old behaviour), and one with
+ORJSONResponse and CompressionMiddleware (the current behaviour). The current
+app is requested with each Accept-Encoding it supports.
+
+Usage:
+    python benchmarks/bench_response_encoding.py --documents 150 --body-size 4000 --requests 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Keep the module level engines away from the real database
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+import httpx
+from fastapi import FastAPI, Depends
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from stream_agent.api.compression import CompressionMiddleware
+from stream_agent.api.database import Base, engine, async_engine, get_db
+from stream_agent.api.models import (
+    User as UserModel, Subreddit as SubredditModel, Run as RunModel, Document as DocumentModel,
+    RunDocument as RunDocumentModel
+)
+from stream_agent.api.main import to_run_with_documents_response
+from stream_agent.api.response_models import RunWithDocumentsResponse
+
+WORDS = (
+    "python async agent reddit subreddit model context protocol server tool call latency "
+    "database index query post comment upvote thread release library framework benchmark "
+    "the a and of to in is that for it with as was on be at by this have from"
+).split()
+
+
+def seed(documents: int, body_size: int) -> str:
+    """Create one run with `documents` documents and return its id."""
+    Base.metadata.create_all(engine)
+    rng = random.Random(0)
+    owner_id, subreddit_id, run_id = (str(uuid.uuid4()) for _ in range(3))
+
+    def body() -> str:
+        text = []
+        while sum(len(word) + 1 for word in text) < body_size:
+            text.append(rng.choice(WORDS))
+        return " ".join(text)
+
+    with engine.begin() as conn:
+        conn.execute(insert(UserModel).values(
+            id=owner_id, username="bench", email="bench@example.com", hashed_password="x"
+        ))
+        conn.execute(insert(SubredditModel).values(
+            id=subreddit_id, owner_id=owner_id, subreddit="bench", time_range="TODAY", limit=10,
+            target_number=10, audience_specification="a", subreddit_description="d"
+        ))
+        conn.execute(insert(RunModel).values(id=run_id, subreddit_id=subreddit_id, owner_id=owner_id, name="bench"))
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "run_id": run_id,
+                "owner_id": owner_id,
+                "url": f"https://www.reddit.com/r/bench/comments/{i}",
+                "content_hash": uuid.uuid4().hex,
+                "title": f"Benchmark post {i}",
+                "content": body(),
+                "doc_metadata": {"subreddit": "bench", "upvotes": rng.randint(0, 5000), "num_comments": rng.randint(0, 500)},
+            }
+            for i in range(documents)
+        ]
+        conn.execute(insert(DocumentModel), rows)
+        conn.execute(insert(RunDocumentModel), [
+            {"run_id": run_id, "document_id": row["id"], "rank": rank, "doc_metadata": row["doc_metadata"]}
+            for rank, row in enumerate(rows)
+        ])
+    return run_id
+
+
+def build_app(response_class, compress: bool) -> FastAPI:
+    app = FastAPI(default_response_class=response_class)
+    if compress:
+        app.add_middleware(CompressionMiddleware)
+
+    @app.get("/runs/{run_id}", response_model=RunWithDocumentsResponse)
+    async def get_run(run_id: str, db: AsyncSession = Depends(get_db)):
+        result = await db.execute(select(RunModel).options(
+            selectinload(RunModel.document_links).selectinload(RunDocumentModel.document)
+        ).where(RunModel.id == run_id))
+        return to_run_with_documents_response(result.scalars().first())
+
+    return app
+
+
+async def measure(app: FastAPI, run_id: str, accept_encoding: str, requests: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Accept-Encoding": accept_encoding}
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(requests + 1):
+            start = time.perf_counter()
+            async with client.stream("GET", f"/runs/{run_id}", headers=headers) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+    latencies = sorted(latencies[1:])  # The first request warms up the pool
+    return {
+        "bytes": len(raw),
+        "encoding": response.headers.get("content-encoding", "identity"),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000,
+    }
+
+
+async def run_all(run_id: str, requests: int) -> dict:
+    before = build_app(JSONResponse, compress=False)
+    after = build_app(ORJSONResponse, compress=True)
+    results = {
+        "json, identity (before)": await measure(before, run_id, "identity", requests),
+        "orjson, identity": await measure(after, run_id, "identity", requests),
+        "orjson, gzip": await measure(after, run_id, "gzip", requests),
+        "orjson, zstd": await measure(after, run_id, "gzip, zstd", requests),
+    }
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=150, help="Documents in the seeded run")
+    parser.add_argument("--body-size", type=int, default=4000, help="Approximate characters per document body")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per configuration")
+    args = parser.parse_args()
+
+    run_id = seed(args.documents, args.body_size)
+    results = asyncio.run(run_all(run_id, args.requests))
+
+    baseline = results["json, identity (before)"]["bytes"]
+    print(f"\nGET /runs/{{run_id}} with {args.documents} documents of ~{args.body_size} characters, "
+          f"{args.requests} requests each\n")
+    print(f"{'configuration':<26}{'encoding':>10}{'bytes':>12}{'ratio':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['encoding']:>10}{r['bytes']:>12}{r['bytes'] / baseline:>8.2f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Read/write contention benchmark: SQLite defaults vs the production profile.
+
+Runs the same workload against two fresh SQLite files. Writers insert
+batches of documents the way a finished run is persisted, each batch in its
+own transaction. Meanwhile readers stream the owner's documents in
+partitions, pausing between them like an NDJSON export to a slow client. The
+"default" profile is the engine as it was created before: rollback journal,
+synchronous=FULL and no pragmas. The "tuned" profile uses the engine
+options and pragmas from stream_agent.api.database (WAL, synchronous=NORMAL,
+mmap, cache size and busy timeout).
+
+Usage:
+    python benchmarks/bench_sqlite_contention.py --writers 4 --batches 50 --batch-size 20 --readers 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Keep the module level engines away from the real database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from stream_agent.api.database import Base, get_engine_options, set_sqlite_pragmas
+from stream_agent.api.models import (
+    User as UserModel, Subreddit as SubredditModel, Run as RunModel, Document as DocumentModel
+)
+
+
+def seed(path: str, tuned: bool) -> tuple:
+    """Create the schema with one user, subreddit and run; return (owner_id, run_id)."""
+    url = f"sqlite:///{path}"
+    engine = create_engine(url, **get_engine_options(url)) if tuned else create_engine(url)
+    if tuned:
+        set_sqlite_pragmas(engine)
+    Base.metadata.create_all(engine)
+
+    owner_id, subreddit_id, run_id = (str(uuid.uuid4()) for _ in range(3))
+    with engine.begin() as conn:
+        conn.execute(insert(UserModel).values(
+            id=owner_id, username="bench", email="bench@example.com", hashed_password="x"
+        ))
+        conn.execute(insert(SubredditModel).values(
+            id=subreddit_id, owner_id=owner_id, subreddit="bench", time_range="TODAY", limit=10,
+            target_number=10, audience_specification="a", subreddit_description="d"
+        ))
+        conn.execute(insert(RunModel).values(id=run_id, subreddit_id=subreddit_id, owner_id=owner_id, name="bench"))
+    engine.dispose()
+    return owner_id, run_id
+
+
+def document_batch(owner_id: str, run_id: str, size: int) -> list:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "run_id": run_id,
+            "owner_id": owner_id,
+            "url": f"https://www.reddit.com/r/bench/{uuid.uuid4()}",
+            "content_hash": uuid.uuid4().hex,
+            "title": "Benchmark document",
+            "content": "x" * 2000,
+            "doc_metadata": {"score": 1},
+        }
+        for _ in range(size)
+    ]
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)]
+
+
+async def measure(tuned: bool, writers: int, batches: int, batch_size: int, readers: int, pause: float) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "contention.db")
+    owner_id, run_id = seed(path, tuned)
+
+    url = f"sqlite+aiosqlite:///{path}"
+    engine = create_async_engine(url, **get_engine_options(url)) if tuned else create_async_engine(url)
+    if tuned:
+        set_sqlite_pragmas(engine.sync_engine)
+
+    errors = {"write": 0, "read": 0}
+    write_latencies = []
+    read_latencies = []
+    writing = True
+
+    async def writer():
+        for _ in range(batches):
+            rows = document_batch(owner_id, run_id, batch_size)
+            start = time.perf_counter()
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(insert(DocumentModel), rows)
+                write_latencies.append(time.perf_counter() - start)
+            except OperationalError:
+                errors["write"] += 1
+
+    async def reader():
+        stmt = (
+            select(DocumentModel.id, DocumentModel.title, DocumentModel.content)
+            .where(DocumentModel.owner_id == owner_id)
+            .order_by(DocumentModel.created_at, DocumentModel.id)
+        )
+        while writing:
+            start = time.perf_counter()
+            try:
+                async with engine.connect() as conn:
+                    result = await conn.stream(stmt)
+                    async for _ in result.partitions(100):
+                        await asyncio.sleep(pause)
+                read_latencies.append(time.perf_counter() - start)
+            except OperationalError:
+                errors["read"] += 1
+
+    start = time.perf_counter()
+    reader_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+    await asyncio.gather(*(writer() for _ in range(writers)))
+    write_time = time.perf_counter() - start
+    writing = False
+    await asyncio.gather(*reader_tasks)
+    await engine.dispose()
+
+    return {
+        "write_s": write_time,
+        "rows_per_s": len(write_latencies) * batch_size / write_time,
+        "commit_p50_ms": percentile(write_latencies, 0.5) * 1000,
+        "commit_p95_ms": percentile(write_latencies, 0.95) * 1000,
+        "exports_per_s": len(read_latencies) / write_time,
+        "locked": errors["write"] + errors["read"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent writers")
+    parser.add_argument("--batches", type=int, default=50, help="Transactions per writer")
+    parser.add_argument("--batch-size", type=int, default=20, help="Documents inserted per transaction")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent exporting readers")
+    parser.add_argument("--pause", type=float, default=0.002, help="Seconds a reader pauses between partitions")
+    args = parser.parse_args()
+
+    workload = (args.writers, args.batches, args.batch_size, args.readers, args.pause)
+    results = {
+        "default (before)": asyncio.run(measure(False, *workload)),
+        "tuned (after)": asyncio.run(measure(True, *workload)),
+    }
+
+    print(f"\n{args.writers} writers x {args.batches} transactions x {args.batch_size} documents, "
+          f"{args.readers} readers exporting meanwhile\n")
+    print(f"{'profile':<20}{'write s':>10}{'rows/s':>10}{'commit p50 ms':>15}{'commit p95 ms':>15}{'exports/s':>11}{'locked':>8}")
+    for profile, r in results.items():
+        print(f"{profile:<20}{r['write_s']:>10.2f}{r['rows_per_s']:>10.0f}{r['commit_p50_ms']:>15.1f}"
+              f"{r['commit_p95_ms']:>15.1f}{r['exports_per_s']:>11.1f}{r['locked']:>8}")
+
+
+if __name__ == "__main__":
+    main()
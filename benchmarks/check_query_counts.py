@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Check that nested read endpoints issue a fixed number of SQL statements.
+
+Seeds a temporary SQLite database with a subreddit, run and document that
+each have `n` children, calls the nested endpoints for several values of `n`
+and counts the statements each request sends to the database. The counts
+must not depend on `n`; the script exits with status 1 if any of them grows.
+
+Usage:
+    python benchmarks/check_query_counts.py --sizes 1 10 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+DB_DIR = tempfile.mkdtemp(prefix="check_query_counts_")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_DIR}/check.db"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from sqlalchemy import event
+
+from stream_agent.api.auth import create_access_token
+from stream_agent.api.database import Base, SessionLocal, async_engine, engine
+from stream_agent.api.main import app
+from stream_agent.api.models import (
+    User as UserModel, Subreddit as SubredditModel, Run as RunModel,
+    Document as DocumentModel, RunDocument as RunDocumentModel, AIGeneratedComment as CommentModel
+)
+
+
+def seed(username: str, n: int) -> dict:
+    """Create a subreddit with n runs, a run with n documents and a document with n comments."""
+    with SessionLocal() as db:
+        user_id = str(uuid.uuid4())
+        db.add(UserModel(id=user_id, username=username, email=f"{username}@example.com", hashed_password="x"))
+        subreddit_id = str(uuid.uuid4())
+        db.add(SubredditModel(
+            id=subreddit_id, subreddit=username, time_range="TODAY", limit=100, target_number=10,
+            audience_specification="", subreddit_description="", owner_id=user_id
+        ))
+        run_ids = [str(uuid.uuid4()) for _ in range(n)]
+        db.add_all([RunModel(id=run_id, name=run_id, subreddit_id=subreddit_id, owner_id=user_id) for run_id in run_ids])
+        document_ids = [str(uuid.uuid4()) for _ in range(n)]
+        db.add_all([
+            DocumentModel(id=doc_id, title="post", content="body", content_hash=doc_id, run_id=run_ids[0], owner_id=user_id)
+            for doc_id in document_ids
+        ])
+        db.add_all([
+            RunDocumentModel(run_id=run_ids[0], document_id=doc_id, rank=rank)
+            for rank, doc_id in enumerate(document_ids)
+        ])
+        db.add_all([
+            CommentModel(id=str(uuid.uuid4()), content="comment", tone="Casual", document_id=document_ids[0], owner_id=user_id)
+            for _ in range(n)
+        ])
+        db.commit()
+
+    return {
+        "/subreddits/{id}": f"/subreddits/{subreddit_id}",
+        "/runs/{id}": f"/runs/{run_ids[0]}",
+        "/documents/{id}": f"/documents/{document_ids[0]}",
+    }
+
+
+async def count_statements(sizes: list) -> dict:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+
+    counts = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        for n in sizes:
+            username = f"user{n}"
+            paths = seed(username, n)
+            headers = {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+            for route, path in paths.items():
+                statements.clear()
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                counts.setdefault(route, {})[n] = len(statements)
+
+    await async_engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="Children per parent to seed")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    counts = asyncio.run(count_statements(args.sizes))
+
+    print(f"{'route':<20}" + "".join(f"{f'n={n}':>10}" for n in args.sizes))
+    failed = False
+    for route, by_size in counts.items():
+        print(f"{route:<20}" + "".join(f"{by_size[n]:>10}" for n in args.sizes))
+        if len(set(by_size.values())) > 1:
+            failed = True
+
+    if failed:
+        print("\nFAIL: statement count grows with the number of children")
+        sys.exit(1)
+    print("\nOK: statement counts are independent of the number of children")
+
+
+if __name__ == "__main__":
+    main()
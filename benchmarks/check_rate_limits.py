@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Check the per-user token-bucket limits of the expensive endpoints.
+
+Swaps the app's rate limit backend for an in-memory one driven by a fake
+clock, then has two users call POST /subreddits/{id}/process,
+POST /subreddits/process-all and GET /documents/search against a temporary
+SQLite database. Each user must get exactly the configured burst before a
+429 with a Retry-After that matches the refill rate, one user's requests
+must not spend the other's tokens, and the bucket must refill as the clock
+advances. The script exits with status 1 if any expectation fails.
+
+Usage:
+    python benchmarks/check_rate_limits.py --burst 3 --period 60
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+DB_DIR = tempfile.mkdtemp(prefix="check_rate_limits_")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_DIR}/check.db"
+# Accepted runs stay queued instead of calling out to Reddit and the LLM
+os.environ["PROCESS_WORKERS"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx
+
+from stream_agent.api.auth import create_access_token
+from stream_agent.api.database import SessionLocal, async_engine
+from stream_agent.api.init_db import create_tables
+from stream_agent.api.jobs import job_queue
+from stream_agent.api.main import app
+from stream_agent.api.models import User as UserModel, Subreddit as SubredditModel
+from stream_agent.api.ratelimit import InMemoryRateLimitBackend, Rate, rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def seed(username: str, subreddits: int) -> tuple:
+    """Create a user with some subreddits and return their token and subreddit ids."""
+    with SessionLocal() as db:
+        user_id = str(uuid.uuid4())
+        db.add(UserModel(id=user_id, username=username, email=f"{username}@example.com", hashed_password="x"))
+        subreddit_ids = [str(uuid.uuid4()) for _ in range(subreddits)]
+        db.add_all([
+            SubredditModel(
+                id=subreddit_id, subreddit=f"{username}{i}", time_range="TODAY", limit=10, target_number=5,
+                audience_specification="", subreddit_description="", owner_id=user_id
+            )
+            for i, subreddit_id in enumerate(subreddit_ids)
+        ])
+        db.commit()
+    return create_access_token({"sub": username}), subreddit_ids
+
+
+async def check(burst: int, period: float) -> list:
+    clock = FakeClock()
+    rate = Rate(capacity=burst, refill_per_second=burst / period)
+    rate_limiter.backend = InMemoryRateLimitBackend(clock=clock)
+    rate_limiter.rates = {"process": rate, "search": rate}
+    job_queue.start()
+
+    # Queued runs never finish, so each accepted call needs a subreddit without a run in progress
+    alice, alice_subreddits = seed("alice", 3 * burst + 1)
+    bob, _ = seed("bob", 1)
+    failures = []
+
+    def expect(name: str, condition: bool):
+        print(f"{'ok' if condition else 'FAIL':<6}{name}")
+        if not condition:
+            failures.append(name)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        def get(token: str, path: str, **kwargs):
+            return client.get(path, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+
+        def post(token: str, path: str, **kwargs):
+            return client.post(path, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+
+        statuses = [(await get(alice, "/documents/search", params={"q": "post"})).status_code for _ in range(burst)]
+        expect(f"first {burst} searches pass", statuses == [200] * burst)
+        limited = await get(alice, "/documents/search", params={"q": "post"})
+        expect("next search is limited with 429", limited.status_code == 429)
+        retry_after = int(limited.headers.get("retry-after", 0))
+        expect(f"Retry-After is one refill ({retry_after}s)", retry_after == math.ceil(period / burst))
+        expect("other user is not limited", (await get(bob, "/documents/search", params={"q": "post"})).status_code == 200)
+
+        clock.now += retry_after
+        expect("search passes again after Retry-After", (await get(alice, "/documents/search", params={"q": "post"})).status_code == 200)
+        expect("and is limited right after", (await get(alice, "/documents/search", params={"q": "post"})).status_code == 429)
+
+        statuses = [(await post(alice, f"/subreddits/{subreddit_id}/process")).status_code for subreddit_id in alice_subreddits[:burst]]
+        expect(f"first {burst} process calls are accepted", statuses == [202] * burst)
+        expect("next process call is limited", (await post(alice, f"/subreddits/{alice_subreddits[-1]}/process")).status_code == 429)
+
+        clock.now += period
+        statuses = [(await post(alice, f"/subreddits/{alice_subreddits[0]}/process")).status_code for _ in range(burst + 1)]
+        expect("process calls on a subreddit with a run in progress get 409", statuses == [409] * (burst + 1))
+        response = await post(alice, "/subreddits/process-all", json={"subreddit_ids": alice_subreddits[burst:2 * burst]})
+        expect(f"batch of {burst} spends the full bucket, untouched by the 409s", response.status_code == 202)
+        expect("next process call is limited", (await post(alice, f"/subreddits/{alice_subreddits[-1]}/process")).status_code == 429)
+
+        clock.now += period
+        response = await post(alice, "/subreddits/process-all", json={"subreddit_ids": alice_subreddits})
+        expect("batch larger than the burst passes with a full bucket", response.status_code == 202)
+        expect("subreddits with a run in progress are skipped, not charged",
+               len(response.json()["runs"]) == burst + 1 and len(response.json()["errors"]) == 2 * burst)
+
+    await job_queue.stop()
+    await async_engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=3, help="Bucket capacity of the checked routes")
+    parser.add_argument("--period", type=float, default=60, help="Seconds in which a bucket refills completely")
+    args = parser.parse_args()
+
+    create_tables()
+    failures = asyncio.run(check(args.burst, args.period))
+    if failures:
+        print(f"\nFAIL: {len(failures)} expectations failed")
+        sys.exit(1)
+    print("\nOK: limits apply per user and route and refill over time")
+
+
+if __name__ == "__main__":
+    main()
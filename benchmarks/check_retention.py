@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Check that retention policies archive expired runs and that archives restore them.
+
+Seeds a temporary SQLite database with a user whose subreddits keep their
+newest --keep runs or their runs of the last --days days, with documents
+shared between consecutive runs and comments on them. A sweep must archive
+exactly the expired runs to compressed files, delete their rows while keeping
+the documents newer runs still link, and give the freed pages back to the
+filesystem. Restoring an archive through POST /archives/{run_id}/restore must
+bring back the run's documents, ranks and comments as they were, findable by
+search, and the next sweep must leave the restored run alone. The script
+exits with status 1 if any expectation fails.
+
+Usage:
+    python benchmarks/check_retention.py --runs 40 --documents 50 --keep 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DB_DIR = tempfile.mkdtemp(prefix="check_retention_")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_DIR}/check.db"
+os.environ["ARCHIVE_DIR"] = f"{DB_DIR}/archives"
+os.environ["RETENTION_ENABLED"] = "false"
+os.environ["SCHEDULER_ENABLED"] = "false"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import DatabaseError
+
+from stream_agent.api.auth import create_access_token
+from stream_agent.api.database import SessionLocal, async_engine, engine
+from stream_agent.api.init_db import create_tables
+from stream_agent.api.main import app
+from stream_agent.api.models import (
+    User as UserModel, Subreddit as SubredditModel, Run as RunModel, Document as DocumentModel,
+    RunDocument as RunDocumentModel, AIGeneratedComment as CommentModel, RunArchive as RunArchiveModel
+)
+from stream_agent.api.retention import ARCHIVE_DIR, sweep
+
+
+def seed_subreddit(db, user_id: str, name: str, runs: int, documents: int, **policy) -> list:
+    """Create a subreddit with one run a day, each sharing half its documents with the next; return run ids, oldest first."""
+    subreddit_id = str(uuid.uuid4())
+    db.add(SubredditModel(
+        id=subreddit_id, subreddit=name, time_range="DAY", limit=documents, target_number=documents,
+        audience_specification="", subreddit_description="", owner_id=user_id, **policy
+    ))
+    db.flush()
+
+    now = datetime.utcnow()
+    run_ids, previous = [], []
+    for i in range(runs):
+        run_id = str(uuid.uuid4())
+        created_at = now - timedelta(days=runs - i - 0.5)
+        db.execute(insert(RunModel), [{
+            "id": run_id, "name": f"{name}-{i}", "subreddit_id": subreddit_id, "owner_id": user_id,
+            "status": "completed", "created_at": created_at
+        }])
+        fresh = [
+            {
+                "id": str(uuid.uuid4()), "title": f"{name} post r{i}d{j} about archiving",
+                "content": f"Body {i}-{j} " + "lorem ipsum dolor sit amet " * 80,
+                "url": f"https://reddit.com/r/{name}/{i}/{j}", "content_hash": f"{name}-{i}-{j}",
+                "doc_metadata": {"score": j}, "run_id": run_id, "owner_id": user_id, "created_at": created_at
+            }
+            for j in range(documents - len(previous))
+        ]
+        db.execute(insert(DocumentModel), fresh)
+        linked = previous + [row["id"] for row in fresh]
+        db.execute(insert(RunDocumentModel), [
+            {"run_id": run_id, "document_id": document_id, "rank": rank, "doc_metadata": {"rank": rank}, "created_at": created_at}
+            for rank, document_id in enumerate(linked)
+        ])
+        db.execute(insert(CommentModel), [
+            {
+                "id": str(uuid.uuid4()), "content": f"Comment on {document_id}", "tone": "casual",
+                "document_id": document_id, "owner_id": user_id, "created_at": created_at
+            }
+            for document_id in linked[::5]
+        ])
+        # Newer runs see half of these documents again
+        previous = linked[:documents // 2]
+        run_ids.append(run_id)
+    db.commit()
+    return run_ids
+
+
+def run_snapshot(db, run_id: str) -> tuple:
+    """A run's documents by rank, with their text and comments, to compare before archiving and after restoring."""
+    links = db.execute(
+        select(RunDocumentModel.rank, RunDocumentModel.doc_metadata, DocumentModel.title, DocumentModel.content, DocumentModel.id)
+        .join(DocumentModel, DocumentModel.id == RunDocumentModel.document_id)
+        .where(RunDocumentModel.run_id == run_id)
+        .order_by(RunDocumentModel.rank)
+    ).all()
+    comments = db.scalars(
+        select(CommentModel.id).where(CommentModel.document_id.in_([link.id for link in links])).order_by(CommentModel.id)
+    ).all()
+    return [(link.rank, link.doc_metadata, link.title, link.content) for link in links], comments
+
+
+def search_index_ok(db) -> bool:
+    """Whether the FTS5 index agrees with the documents it indexes."""
+    try:
+        db.execute(text("INSERT INTO documents_fts(documents_fts) VALUES ('integrity-check')"))
+    except DatabaseError:
+        return False
+    finally:
+        db.rollback()
+    return True
+
+
+def database_size() -> int:
+    path = Path(DB_DIR) / "check.db"
+    return path.stat().st_size
+
+
+async def check(args) -> list:
+    failures = []
+
+    def expect(name: str, condition: bool):
+        print(f"{'ok' if condition else 'FAIL':<6}{name}")
+        if not condition:
+            failures.append(name)
+
+    with SessionLocal() as db:
+        user_id = str(uuid.uuid4())
+        db.add(UserModel(id=user_id, username="keeper", email="keeper@example.com", hashed_password="x"))
+        db.commit()
+        by_count = seed_subreddit(db, user_id, "bycount", args.runs, args.documents, retention_runs=args.keep)
+        by_age = seed_subreddit(db, user_id, "byage", args.runs, args.documents, retention_days=args.days)
+        unlimited = seed_subreddit(db, user_id, "unlimited", 3, args.documents)
+        expected = by_count[:-args.keep] + by_age[:args.runs - args.days]
+        snapshot = run_snapshot(db, by_count[0])
+        kept_documents = {row[2] for row in run_snapshot(db, by_count[-args.keep])[0]}
+    token = create_access_token({"sub": "keeper"})
+
+    # Checkpoint the WAL so the file size reflects the seeded pages
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    size_before = database_size()
+
+    archived = await sweep(batch_size=args.batch_size)
+    expect(f"sweep archives the {len(expected)} expired runs", archived == len(expected))
+
+    with SessionLocal() as db:
+        remaining = set(db.scalars(select(RunModel.id)).all())
+        expect("expired runs are deleted", not remaining & set(expected))
+        expect("kept runs remain", set(by_count[-args.keep:] + by_age[-args.days:] + unlimited) <= remaining)
+        archives = {archive.run_id: (archive.path, archive.size_bytes) for archive in db.scalars(select(RunArchiveModel)).all()}
+        expect("each expired run has an archive row", set(archives) == set(expected))
+        expect("each archive file exists", all((ARCHIVE_DIR / path).is_file() for path, _ in archives.values()))
+        titles = set(db.scalars(select(DocumentModel.title)).all())
+        expect("documents linked by kept runs are kept", kept_documents <= titles)
+        orphans = db.scalar(
+            select(func.count()).select_from(DocumentModel)
+            .where(~select(RunDocumentModel.run_id).where(RunDocumentModel.document_id == DocumentModel.id).exists())
+        )
+        expect("no document is left without a run", orphans == 0)
+        expect("search index matches the documents", search_index_ok(db))
+        expect("no free pages are left", db.scalar(text("PRAGMA freelist_count")) == 0)
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    size_after = database_size()
+    archive_bytes = sum(size for _, size in archives.values())
+    print(f"      database {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB, "
+          f"archives {archive_bytes / 1e6:.2f} MB for {len(archives)} runs")
+    expect("database file shrinks", size_after < size_before)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        headers = {"Authorization": f"Bearer {token}"}
+        listed = (await client.get("/archives/", headers=headers)).json()
+        expect("GET /archives/ lists the archives", {archive["run_id"] for archive in listed} == set(expected))
+
+        response = await client.post(f"/archives/{by_count[0]}/restore", headers=headers)
+        expect("restore returns the run", response.status_code == 200 and response.json()["id"] == by_count[0])
+        again = await client.post(f"/archives/{by_count[0]}/restore", headers=headers)
+        expect("restoring twice is a 404", again.status_code == 404)
+
+        found = (await client.get("/documents/search", headers=headers, params={"q": "r0d1"})).json()
+        expect("restored documents are searchable", any(result["title"] == "bycount post r0d1 about archiving" for result in found))
+
+    with SessionLocal() as db:
+        expect("restored run matches the archived one", run_snapshot(db, by_count[0]) == snapshot)
+        expect("restored archive is removed", db.get(RunArchiveModel, by_count[0]) is None)
+        expect("search index still matches the documents", search_index_ok(db))
+    expect("restored archive file is removed", not (ARCHIVE_DIR / archives[by_count[0]][0]).exists())
+
+    archived = await sweep(batch_size=args.batch_size)
+    expect("next sweep keeps the restored run", archived == 0)
+
+    await async_engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=40, help="Runs seeded per subreddit, one a day")
+    parser.add_argument("--documents", type=int, default=50, help="Documents per run")
+    parser.add_argument("--keep", type=int, default=5, help="retention_runs of the first subreddit")
+    parser.add_argument("--days", type=int, default=10, help="retention_days of the second subreddit")
+    parser.add_argument("--batch-size", type=int, default=7, help="Runs archived per transaction")
+    args = parser.parse_args()
+
+    create_tables()
+    failures = asyncio.run(check(args))
+    if failures:
+        print(f"\nFAIL: {len(failures)} expectations failed")
+        sys.exit(1)
+    print("\nOK: expired runs are archived, compacted away and restored intact")
+
+
+if __name__ == "__main__":
+    main()
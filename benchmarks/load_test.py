@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Load test of the API against a large seeded database.
+
+Seeds a SQLite database with synthetic users, subreddits, runs, documents and
+comments through the API models and the real migrations (so the search index
+and its triggers are populated too), then drives the FastAPI app in-process
+with concurrent clients, one endpoint at a time, and reports throughput and
+p50/p95/p99 latency per endpoint.
+
+Arcade and the LLM are replaced by local stand-ins with a configurable
+latency, so processing runs the real pipeline (auth, fetch, filter, expand,
+rank, translate, save) offline. Rate limits are disabled and the job queue is
+sized to hold every queued run. A subreddit with a run in progress refuses
+another with 409, so processing requests go to distinct subreddits (3 are
+seeded per user, which bounds --requests) after the warm-up runs finish.
+
+Everything is seeded from --seed, so two runs with the same arguments see the
+same data. --db keeps the seeded database between runs; it is reseeded when
+the seeding arguments change. --json writes the results, and --baseline
+compares them with an earlier --json file, exiting with status 1 if the p95
+of an endpoint grew by more than --tolerance.
+
+Usage:
+    python benchmarks/load_test.py --scale ci --concurrency 8 --requests 300
+    python benchmarks/load_test.py --scale full --db /var/tmp/load.db --json results.json
+    python benchmarks/load_test.py --scale ci --db /var/tmp/ci.db --baseline results.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+SCALES = {
+    "ci": {"users": 100, "runs": 2000, "documents": 50000},
+    "full": {"users": 1000, "runs": 50000, "documents": 1000000},
+}
+SUBREDDITS_PER_USER = 3
+# Documents that get an AI-generated comment
+COMMENTED_FRACTION = 0.2
+
+WORDS = (
+    "python async agent reddit subreddit model context protocol server tool call latency "
+    "database index query post comment upvote thread release library framework benchmark "
+    "the a and of to in is that for it with as was on be at by this have from"
+).split()
+
+ENDPOINTS = [
+    "GET /documents/",
+    "GET /comments/",
+    "GET /runs/",
+    "GET /runs/{run_id}",
+    "GET /documents/search",
+    "POST /subreddits/{subreddit_id}/process",
+]
+
+
+class LocalArcade:
+    """Stand-in for AsyncArcade serving the two Reddit tools from generated posts."""
+
+    # Every call lists a few posts no earlier call has, like a live subreddit
+    counters = {}
+
+    def __init__(self, latency: float = 0.0, posts: int = 25):
+        self.latency = latency
+        self.posts = posts
+        self.tools = SimpleNamespace(get=self._get_tool, execute=self._execute)
+
+    async def _get_tool(self, name: str):
+        return SimpleNamespace(requirements=SimpleNamespace(authorization=SimpleNamespace(
+            provider_id="reddit", oauth2=SimpleNamespace(scopes=[])
+        )))
+
+    async def _execute(self, tool_name: str, input: dict, user_id: str = None):
+        await asyncio.sleep(self.latency)
+        if tool_name == "Reddit.GetPostsInSubreddit":
+            subreddit = input["subreddit"]
+            start = self.counters.get(subreddit, 0)
+            self.counters[subreddit] = start + 5
+            posts = [self._post(f"{subreddit}_{n}") for n in range(start, start + self.posts)]
+            value = {"posts": posts[:input["limit"]], "cursor": None}
+        else:
+            value = {"posts": [
+                {**self._post(post_id), "body": " ".join(random.Random(post_id).choices(WORDS, k=80))}
+                for post_id in input["post_identifiers"]
+            ]}
+        return SimpleNamespace(output=SimpleNamespace(value=value))
+
+    def _post(self, post_id: str) -> dict:
+        subreddit, n = post_id.rsplit("_", 1)
+        rng = random.Random(post_id)
+        return {
+            "id": post_id,
+            "title": f"Post {n} in r/{subreddit}",
+            "author": f"author{rng.randrange(1000)}",
+            "subreddit": subreddit,
+            "permalink": f"/r/{subreddit}/comments/{post_id}/",
+            "url": f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/",
+            "created_utc": time.time() - rng.randrange(86400),
+            "upvotes": rng.randrange(5000),
+            "num_comments": rng.randrange(500),
+            "is_video": rng.random() < 0.1,
+        }
+
+
+class LocalChatModel:
+    """Stand-in for the ranking LLM: ranks posts in the order they were given."""
+
+    def __init__(self, latency: float = 0.0, schema: type = None):
+        self.latency = latency
+        self.schema = schema
+
+    def with_structured_output(self, schema: type) -> "LocalChatModel":
+        return LocalChatModel(self.latency, schema)
+
+    async def ainvoke(self, messages: list):
+        await asyncio.sleep(self.latency)
+        post_fields = [name for name in self.schema.model_fields if name.startswith("post_")]
+        values = {"rationale": "Ranked by a local stand-in"}
+        for rank, name in enumerate(post_fields, start=1):
+            values[name] = rank
+            values[f"category_{name[len('post_'):]}"] = "Casual"
+        return self.schema(**values)
+
+
+def configure(args):
+    """Point the app at the load test database and remove limits that would skew the results."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ["RATE_LIMIT_PROCESS"] = ""
+    os.environ["RATE_LIMIT_SEARCH"] = ""
+    os.environ["RATE_LIMIT_COMMENTS_BATCH"] = ""
+    # The local Arcade and LLM stand-ins have no rate limits to respect
+    os.environ["ARCADE_RATE_LIMIT"] = ""
+    os.environ["LLM_RATE_LIMIT"] = ""
+    os.environ["SCHEDULER_ENABLED"] = "false"
+    os.environ["RETENTION_ENABLED"] = "false"
+    # The schema is migrated before seeding
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "false"
+    os.environ.setdefault("PROCESS_QUEUE_SIZE", str(max(100, args.requests + args.warmup)))
+    os.environ.setdefault("USER_ID", "load-test")
+
+
+def install_stand_ins(args):
+    """Replace Arcade and the LLM in the Reddit pipeline with local stand-ins."""
+    from stream_agent.parser_agents.reddit import agent
+
+    agent.AsyncArcade = lambda *a, **k: LocalArcade(latency=args.arcade_latency)
+    agent.get_llm = lambda *a, **k: LocalChatModel(latency=args.llm_latency)
+
+
+def seed(args) -> dict:
+    """Create the synthetic dataset and return what the clients need to address it."""
+    from sqlalchemy import insert
+
+    from stream_agent.api.database import engine
+    from stream_agent.api.models import (
+        User as UserModel, Subreddit as SubredditModel, Run as RunModel, Document as DocumentModel,
+        RunDocument as RunDocumentModel, AIGeneratedComment as CommentModel
+    )
+    from stream_agent.api.persistence import document_hash
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    users = [{"id": str(uuid.UUID(int=rng.getrandbits(128))), "username": f"user{i}"} for i in range(args.users)]
+    subreddits = [
+        {"id": str(uuid.UUID(int=rng.getrandbits(128))), "owner_id": user["id"], "subreddit": f"{user['username']}_sub{j}"}
+        for user in users for j in range(SUBREDDITS_PER_USER)
+    ]
+
+    with engine.begin() as conn:
+        conn.execute(insert(UserModel), [
+            {**user, "email": f"{user['username']}@example.com", "hashed_password": "x", "created_at": now - timedelta(days=365)}
+            for user in users
+        ])
+        conn.execute(insert(SubredditModel), [
+            {
+                **subreddit, "time_range": "TODAY", "limit": 25, "target_number": 10,
+                "audience_specification": "Developers", "subreddit_description": "A synthetic subreddit",
+                "created_at": now - timedelta(days=365)
+            }
+            for subreddit in subreddits
+        ])
+
+    def body() -> str:
+        return " ".join(rng.choices(WORDS, k=args.body_words))
+
+    runs_by_user = {user["id"]: [] for user in users}
+    documents_left = args.documents
+    started = time.perf_counter()
+    run_rows, document_rows, link_rows, comment_rows = [], [], [], []
+
+    def flush():
+        with engine.begin() as conn:
+            for model, rows in (
+                (RunModel, run_rows), (DocumentModel, document_rows), (RunDocumentModel, link_rows), (CommentModel, comment_rows)
+            ):
+                if rows:
+                    conn.execute(insert(model), rows)
+                    rows.clear()
+
+    for i in range(args.runs):
+        subreddit = subreddits[rng.randrange(len(subreddits))]
+        created_at = now - timedelta(seconds=rng.randrange(90 * 86400))
+        run_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        run_rows.append({
+            "id": run_id, "name": created_at.strftime("%Y-%m-%d %H:%M:%S"), "subreddit_id": subreddit["id"],
+            "owner_id": subreddit["owner_id"], "status": "completed", "created_at": created_at, "updated_at": created_at
+        })
+        runs_by_user[subreddit["owner_id"]].append(run_id)
+
+        # Spread the documents evenly over the runs
+        count = documents_left // (args.runs - i)
+        documents_left -= count
+        for rank in range(count):
+            document_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            url = f"https://www.reddit.com/r/{subreddit['subreddit']}/comments/{document_id[:8]}/"
+            title = " ".join(rng.choices(WORDS, k=8))
+            content = body()
+            metadata = {"subreddit": subreddit["subreddit"], "upvotes": rng.randrange(5000), "num_comments": rng.randrange(500)}
+            document_rows.append({
+                "id": document_id, "title": title, "content": content, "url": url,
+                "content_hash": document_hash(url, title, content), "doc_metadata": metadata, "run_id": run_id,
+                "owner_id": subreddit["owner_id"], "created_at": created_at, "updated_at": created_at
+            })
+            link_rows.append({"run_id": run_id, "document_id": document_id, "rank": rank, "doc_metadata": metadata, "created_at": created_at})
+            if rng.random() < COMMENTED_FRACTION:
+                comment_rows.append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))), "content": body(), "tone": "Casual",
+                    "document_id": document_id, "owner_id": subreddit["owner_id"], "created_at": created_at
+                })
+
+        if len(document_rows) >= 5000 or len(run_rows) >= 5000:
+            flush()
+            done = args.documents - documents_left
+            print(f"  seeded {i + 1}/{args.runs} runs, {done}/{args.documents} documents "
+                  f"({time.perf_counter() - started:.0f}s)", end="\r", flush=True)
+    flush()
+    print(f"  seeded {args.runs} runs and {args.documents} documents in {time.perf_counter() - started:.0f}s" + " " * 20)
+
+    return {
+        "users": [
+            {
+                "username": user["username"],
+                "subreddit_ids": [s["id"] for s in subreddits if s["owner_id"] == user["id"]],
+                "run_ids": runs_by_user[user["id"]][:10],
+            }
+            for user in users
+        ]
+    }
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def drive(app, dataset: dict, args) -> dict:
+    """Send --requests requests to each endpoint from --concurrency clients and time them."""
+    import httpx
+    from sqlalchemy import func, select
+
+    from stream_agent.api.auth import create_access_token
+    from stream_agent.api.database import AsyncSessionLocal, async_engine
+    from stream_agent.api.models import Run as RunModel
+    from stream_agent.api.persistence import delete_runs
+
+    rng = random.Random(args.seed)
+    users = [
+        {**user, "headers": {"Authorization": f"Bearer {create_access_token({'sub': user['username']})}"}}
+        for user in dataset["users"]
+    ]
+
+    # Subreddits in a fixed random order, each processed once until all have been
+    idle_subreddits = [(user, subreddit_id) for user in users for subreddit_id in user["subreddit_ids"]]
+    rng.shuffle(idle_subreddits)
+    next_subreddit = itertools.cycle(idle_subreddits)
+
+    async def wait_for_runs():
+        while True:
+            async with AsyncSessionLocal() as db:
+                in_progress = await db.scalar(select(func.count()).where(RunModel.status == "in_progress"))
+            if not in_progress:
+                return
+            await asyncio.sleep(0.1)
+
+    def request_for(endpoint: str) -> tuple:
+        user = rng.choice(users)
+        if endpoint == "GET /documents/":
+            return "GET", "/documents/", {"limit": 100}, user["headers"]
+        if endpoint == "GET /comments/":
+            return "GET", "/comments/", {"limit": 100}, user["headers"]
+        if endpoint == "GET /runs/":
+            return "GET", "/runs/", {"limit": 100}, user["headers"]
+        if endpoint == "GET /runs/{run_id}":
+            user = rng.choice([u for u in users if u["run_ids"]])
+            return "GET", f"/runs/{rng.choice(user['run_ids'])}", None, user["headers"]
+        if endpoint == "GET /documents/search":
+            return "GET", "/documents/search", {"q": " ".join(rng.sample(WORDS[:30], 2))}, user["headers"]
+        user, subreddit_id = next(next_subreddit)
+        return "POST", f"/subreddits/{subreddit_id}/process", None, user["headers"]
+
+    results = {}
+    load_started_at = datetime.utcnow()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+            for endpoint in args.endpoints:
+                # Warm up caches and connections before measuring
+                for method, path, params, headers in [request_for(endpoint) for _ in range(args.warmup)]:
+                    await client.request(method, path, params=params, headers=headers)
+                await wait_for_runs()
+
+                requests = [request_for(endpoint) for _ in range(args.requests)]
+                latencies, errors = [], 0
+                queue = asyncio.Queue()
+                for request in requests:
+                    queue.put_nowait(request)
+
+                async def worker():
+                    nonlocal errors
+                    while not queue.empty():
+                        method, path, params, headers = queue.get_nowait()
+                        started = time.perf_counter()
+                        response = await client.request(method, path, params=params, headers=headers)
+                        latencies.append(time.perf_counter() - started)
+                        if response.status_code >= 400:
+                            errors += 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+                elapsed = time.perf_counter() - started
+
+                latencies.sort()
+                results[endpoint] = {
+                    "requests": len(latencies),
+                    "errors": errors,
+                    "throughput": len(latencies) / elapsed,
+                    "p50_ms": percentile(latencies, 0.50) * 1000,
+                    "p95_ms": percentile(latencies, 0.95) * 1000,
+                    "p99_ms": percentile(latencies, 0.99) * 1000,
+                }
+
+                if endpoint.startswith("POST /subreddits/"):
+                    # The endpoint only queues runs; also report how fast the pipeline drains them
+                    await wait_for_runs()
+                    drained = time.perf_counter() - started
+                    results[endpoint]["runs_per_second"] = len(latencies) / drained
+
+    # Remove the runs processed here, so a reused dataset is the same for every load test
+    async with AsyncSessionLocal() as db:
+        run_ids = (await db.scalars(select(RunModel.id).where(RunModel.created_at >= load_started_at))).all()
+        await delete_runs(db, list(run_ids))
+        await db.commit()
+    await async_engine.dispose()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Endpoints whose p95 grew by more than tolerance; increases under a millisecond are noise."""
+    regressions = []
+    for endpoint, result in results.items():
+        before = baseline.get(endpoint)
+        if before and result["p95_ms"] > before["p95_ms"] * (1 + tolerance) and result["p95_ms"] - before["p95_ms"] > 1:
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']:.1f} ms -> {result['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="ci", help="Dataset size preset")
+    parser.add_argument("--users", type=int, help="Users to seed (overrides --scale)")
+    parser.add_argument("--runs", type=int, help="Runs to seed (overrides --scale)")
+    parser.add_argument("--documents", type=int, help="Documents to seed (overrides --scale)")
+    parser.add_argument("--body-words", type=int, default=60, help="Words per seeded document and comment")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the dataset and the requests")
+    parser.add_argument("--db", help="SQLite file to seed, or to reuse if it was seeded with the same arguments")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per endpoint before measuring")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS, metavar="ENDPOINT",
+                        help=f"Endpoints to load, of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--arcade-latency", type=float, default=0.05, help="Seconds each stand-in Arcade call takes")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds each stand-in LLM call takes")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results of an earlier --json run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative growth of p95 over the baseline")
+    args = parser.parse_args()
+
+    for name, value in SCALES[args.scale].items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+    args.db = args.db or f"{tempfile.mkdtemp(prefix='load_test_')}/load.db"
+
+    # The dataset is reused only if it was seeded with the same arguments
+    seeding = {name: getattr(args, name) for name in ("users", "runs", "documents", "body_words", "seed")}
+    fingerprint = hashlib.sha256(json.dumps(seeding, sort_keys=True).encode()).hexdigest()
+    manifest_path = Path(f"{args.db}.json")
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else None
+    reuse = manifest is not None and manifest["fingerprint"] == fingerprint and Path(args.db).exists()
+    if not reuse:
+        Path(args.db).parent.mkdir(parents=True, exist_ok=True)
+        for path in (args.db, f"{args.db}-wal", f"{args.db}-shm", manifest_path):
+            Path(path).unlink(missing_ok=True)
+
+    configure(args)
+    from stream_agent.api.init_db import create_tables
+    from stream_agent.api.main import app
+    create_tables()
+    install_stand_ins(args)
+
+    if reuse:
+        print(f"Reusing the dataset in {args.db}")
+        dataset = manifest["dataset"]
+    else:
+        print(f"Seeding {args.users} users, {args.runs} runs and {args.documents} documents into {args.db}")
+        dataset = seed(args)
+        manifest_path.write_text(json.dumps({"fingerprint": fingerprint, "dataset": dataset}))
+
+    results = asyncio.run(drive(app, dataset, args))
+
+    print(f"\n{args.requests} requests per endpoint from {args.concurrency} clients\n")
+    print(f"{'endpoint':<42}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for endpoint, r in results.items():
+        print(f"{endpoint:<42}{r['throughput']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['errors']:>8}")
+        if "runs_per_second" in r:
+            print(f"{'  queued runs processed':<42}{r['runs_per_second']:>9.1f} runs/s")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"arguments": vars(args), "results": results}, indent=2))
+
+    failed = any(r["errors"] for r in results.values())
+    if failed:
+        print("\nFAIL: some requests returned an error status")
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text())["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool, text
+
+from stream_agent.api.database import Base, SYNC_DATABASE_URL
+from stream_agent.api import models  # noqa: F401 - registers the tables on Base.metadata
+from stream_agent.api.models import POSTGRES_METADATA_INDEXES
+from stream_agent.api.search import SEARCH_OBJECT_PREFIXES
+
+# Alembic Config object, which provides access to the values in alembic.ini
+config = context.config
+
+# The API's DATABASE_URL always wins over the URL in alembic.ini
+config.set_main_option("sqlalchemy.url", SYNC_DATABASE_URL.replace("%", "%%"))
+
+# Set up loggers, unless migrations run inside an app that configured its own
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Postgres advisory lock held while migrating, so replicas starting together migrate one at a time
+MIGRATION_LOCK_ID = 7_201_523
+
+
+def include_name(name, type_, parent_names):
+    """Leave the full-text search objects and metadata indexes, which have no models, out of autogenerate."""
+    name = name or ""
+    return not name.startswith(SEARCH_OBJECT_PREFIXES) and name not in POSTGRES_METADATA_INDEXES
+
+
+def run_migrations_offline():
+    """Run migrations in 'offline' mode, emitting SQL to stdout."""
+    url = config.get_main_option("sqlalchemy.url")
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
+        render_as_batch=url.startswith("sqlite"),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run migrations in 'online' mode against a live connection."""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            # SQLite can only alter tables by copying them
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            if connection.dialect.name == "postgresql":
+                # Released when the transaction ends; waiting replicas then find the schema up to date
+                connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
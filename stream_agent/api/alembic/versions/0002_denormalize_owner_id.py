@@ -0,0 +1,65 @@
+"""Denormalize owner_id onto runs, documents and comments and index foreign keys
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-07-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Tables that get an owner_id, each with the statement that backfills it from its parent
+OWNED_TABLES = {
+    "runs": "UPDATE runs SET owner_id = "
+            "(SELECT subreddits.owner_id FROM subreddits WHERE subreddits.id = runs.subreddit_id)",
+    "documents": "UPDATE documents SET owner_id = "
+                 "(SELECT runs.owner_id FROM runs WHERE runs.id = documents.run_id)",
+    "ai_generated_comments": "UPDATE ai_generated_comments SET owner_id = "
+                             "(SELECT documents.owner_id FROM documents "
+                             "WHERE documents.id = ai_generated_comments.document_id)",
+}
+
+FOREIGN_KEY_INDEXES = {
+    "subreddits": "owner_id",
+    "runs": "subreddit_id",
+    "documents": "run_id",
+    "ai_generated_comments": "document_id",
+}
+
+
+def upgrade():
+    for table, backfill in OWNED_TABLES.items():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column("owner_id", sa.String(), nullable=True))
+        op.execute(backfill)
+
+    # Rows whose parent no longer exists were never reachable through the API
+    for table in reversed(list(OWNED_TABLES)):
+        op.execute(f"DELETE FROM {table} WHERE owner_id IS NULL")
+
+    for table in OWNED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column("owner_id", existing_type=sa.String(), nullable=False)
+            batch_op.create_foreign_key(f"fk_{table}_owner_id_users", "users", ["owner_id"], ["id"])
+        op.create_index(f"ix_{table}_owner_id_created_at", table, ["owner_id", "created_at", "id"])
+
+    for table, column in FOREIGN_KEY_INDEXES.items():
+        op.create_index(f"ix_{table}_{column}", table, [column])
+
+
+def downgrade():
+    for table, column in FOREIGN_KEY_INDEXES.items():
+        op.drop_index(f"ix_{table}_{column}", table_name=table)
+
+    for table in OWNED_TABLES:
+        op.drop_index(f"ix_{table}_owner_id_created_at", table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f"fk_{table}_owner_id_users", type_="foreignkey")
+            batch_op.drop_column("owner_id")
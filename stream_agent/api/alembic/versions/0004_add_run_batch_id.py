@@ -0,0 +1,28 @@
+"""Add batch_id to runs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-07-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("runs") as batch_op:
+        batch_op.add_column(sa.Column("batch_id", sa.String(), nullable=True))
+    op.create_index("ix_runs_batch_id", "runs", ["batch_id"])
+
+
+def downgrade():
+    op.drop_index("ix_runs_batch_id", table_name="runs")
+    with op.batch_alter_table("runs") as batch_op:
+        batch_op.drop_column("batch_id")
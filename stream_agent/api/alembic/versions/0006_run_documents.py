@@ -0,0 +1,161 @@
+"""Store each document once per owner and link runs to it through run_documents
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-07-21 00:00:00.000000
+
+"""
+import hashlib
+import uuid
+from collections import defaultdict
+from urllib.parse import urlsplit, urlunsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+documents = sa.table(
+    "documents",
+    sa.column("id", sa.String), sa.column("title", sa.String), sa.column("content", sa.Text),
+    sa.column("url", sa.String), sa.column("content_hash", sa.String), sa.column("created_at", sa.DateTime),
+    sa.column("updated_at", sa.DateTime), sa.column("doc_metadata", sa.JSON), sa.column("run_id", sa.String),
+    sa.column("owner_id", sa.String),
+)
+run_documents = sa.table(
+    "run_documents",
+    sa.column("run_id", sa.String), sa.column("document_id", sa.String), sa.column("rank", sa.Integer),
+    sa.column("doc_metadata", sa.JSON), sa.column("created_at", sa.DateTime),
+)
+comments = sa.table("ai_generated_comments", sa.column("document_id", sa.String))
+
+def _normalize_url(url):
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), parts.query, ""))
+
+
+def _document_hash(url, title, content):
+    if url:
+        key = "url:" + _normalize_url(url)
+    else:
+        key = f"text:{title or ''}\0{content or ''}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _search_triggers(connection):
+    if connection.dialect.name != "sqlite":
+        return []
+    return connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'documents'"
+    ).scalars().all()
+
+
+def _restore_search_index(connection, triggers):
+    # Rebuilding documents on SQLite dropped its search triggers and moved rowids
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in triggers:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+
+
+def upgrade():
+    op.create_table(
+        "run_documents",
+        sa.Column("run_id", sa.String(), sa.ForeignKey("runs.id"), primary_key=True),
+        sa.Column("document_id", sa.String(), sa.ForeignKey("documents.id"), primary_key=True),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("doc_metadata", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_run_documents_document_id", "run_documents", ["document_id"])
+
+    bind = op.get_bind()
+    triggers = _search_triggers(bind)
+    with op.batch_alter_table("documents") as batch_op:
+        batch_op.add_column(sa.Column("content_hash", sa.String(), nullable=True))
+
+    # Rows of a run were inserted together, so creation order is their rank
+    rows = bind.execute(sa.select(documents).order_by(documents.c.run_id, documents.c.created_at)).mappings().all()
+
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row["owner_id"], _document_hash(row["url"], row["title"], row["content"]))].append(row)
+
+    # The copy from the latest run becomes the canonical document
+    canonical = {}
+    for (_, key), group in groups.items():
+        keep = max(group, key=lambda row: row["created_at"])
+        for row in group:
+            canonical[row["id"]] = (keep["id"], key)
+
+    links, ranks = {}, defaultdict(int)
+    for row in rows:
+        document_id, _ = canonical[row["id"]]
+        if (row["run_id"], document_id) in links:
+            continue
+        links[(row["run_id"], document_id)] = {
+            "run_id": row["run_id"],
+            "document_id": document_id,
+            "rank": ranks[row["run_id"]],
+            "doc_metadata": row["doc_metadata"],
+            "created_at": row["created_at"],
+        }
+        ranks[row["run_id"]] += 1
+    if links:
+        bind.execute(run_documents.insert(), list(links.values()))
+
+    for document_id, (keep_id, key) in canonical.items():
+        if document_id == keep_id:
+            bind.execute(documents.update().where(documents.c.id == document_id).values(content_hash=key))
+        else:
+            bind.execute(comments.update().where(comments.c.document_id == document_id).values(document_id=keep_id))
+            bind.execute(documents.delete().where(documents.c.id == document_id))
+
+    with op.batch_alter_table("documents") as batch_op:
+        batch_op.alter_column("content_hash", existing_type=sa.String(), nullable=False)
+    op.create_index("ix_documents_owner_id_content_hash", "documents", ["owner_id", "content_hash"], unique=True)
+
+    _restore_search_index(bind, triggers)
+
+
+def downgrade():
+    op.drop_index("ix_documents_owner_id_content_hash", table_name="documents")
+
+    # Give every other run that linked a document its own copy again
+    bind = op.get_bind()
+    copies = bind.execute(
+        sa.select(documents, run_documents.c.run_id.label("link_run_id"),
+                  run_documents.c.doc_metadata.label("link_metadata"), run_documents.c.created_at.label("linked_at"))
+        .join(run_documents, run_documents.c.document_id == documents.c.id)
+        .where(run_documents.c.run_id != documents.c.run_id)
+        .order_by(run_documents.c.run_id, run_documents.c.rank)
+    ).mappings().all()
+    if copies:
+        bind.execute(documents.insert(), [
+            {
+                "id": str(uuid.uuid4()),
+                "title": row["title"],
+                "content": row["content"],
+                "url": row["url"],
+                "content_hash": row["content_hash"],
+                "created_at": row["linked_at"],
+                "updated_at": row["linked_at"],
+                "doc_metadata": row["link_metadata"],
+                "run_id": row["link_run_id"],
+                "owner_id": row["owner_id"],
+            }
+            for row in copies
+        ])
+
+    op.drop_index("ix_run_documents_document_id", table_name="run_documents")
+    op.drop_table("run_documents")
+    triggers = _search_triggers(bind)
+    with op.batch_alter_table("documents") as batch_op:
+        batch_op.drop_column("content_hash")
+    _restore_search_index(bind, triggers)
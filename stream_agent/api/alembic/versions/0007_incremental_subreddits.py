@@ -0,0 +1,41 @@
+"""Add incremental subreddits and the posts their runs have ranked
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-07-23 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("subreddits") as batch_op:
+        batch_op.add_column(sa.Column("incremental", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    op.create_table(
+        "seen_posts",
+        sa.Column("subreddit_id", sa.String(), sa.ForeignKey("subreddits.id"), primary_key=True),
+        sa.Column("post_id", sa.String(), primary_key=True),
+        sa.Column("content_hash", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("ranked_with", sa.Integer(), nullable=False),
+        sa.Column("created_utc", sa.Float(), nullable=False),
+        sa.Column("seen_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_seen_posts_subreddit_id_created_utc", "seen_posts", ["subreddit_id", "created_utc"])
+
+
+def downgrade():
+    op.drop_index("ix_seen_posts_subreddit_id_created_utc", table_name="seen_posts")
+    op.drop_table("seen_posts")
+    with op.batch_alter_table("subreddits") as batch_op:
+        batch_op.drop_column("incremental")
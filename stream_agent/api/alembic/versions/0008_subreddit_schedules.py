@@ -0,0 +1,32 @@
+"""Persist the active flag and schedules of subreddits
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-07-25 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("subreddits") as batch_op:
+        batch_op.add_column(sa.Column("active", sa.Boolean(), nullable=False, server_default=sa.true()))
+        batch_op.add_column(sa.Column("schedule_minutes", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("next_run_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_subreddits_next_run_at", "subreddits", ["next_run_at"])
+
+
+def downgrade():
+    op.drop_index("ix_subreddits_next_run_at", table_name="subreddits")
+    with op.batch_alter_table("subreddits") as batch_op:
+        batch_op.drop_column("next_run_at")
+        batch_op.drop_column("schedule_minutes")
+        batch_op.drop_column("active")
@@ -0,0 +1,66 @@
+"""Add subreddit retention policies and archives of expired runs
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-07-26 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# PRAGMA auto_vacuum value that lets `PRAGMA incremental_vacuum` return free pages to the filesystem
+SQLITE_AUTO_VACUUM_INCREMENTAL = 2
+
+def upgrade():
+    with op.batch_alter_table("subreddits") as batch_op:
+        batch_op.add_column(sa.Column("retention_days", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("retention_runs", sa.Integer(), nullable=True))
+    with op.batch_alter_table("runs") as batch_op:
+        batch_op.add_column(sa.Column("restored_at", sa.DateTime(), nullable=True))
+
+    op.create_table(
+        "run_archives",
+        sa.Column("run_id", sa.String(), primary_key=True),
+        sa.Column("subreddit_id", sa.String(), sa.ForeignKey("subreddits.id"), nullable=False),
+        sa.Column("owner_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("run_created_at", sa.DateTime(), nullable=False),
+        sa.Column("documents_count", sa.Integer(), nullable=False),
+        sa.Column("comments_count", sa.Integer(), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_run_archives_subreddit_id", "run_archives", ["subreddit_id"])
+    op.create_index("ix_run_archives_owner_id", "run_archives", ["owner_id"])
+
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        auto_vacuum = bind.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        if auto_vacuum != SQLITE_AUTO_VACUUM_INCREMENTAL:
+            # Switching an existing database to incremental auto-vacuum takes one full VACUUM,
+            # which cannot run inside a transaction and may renumber the documents rowids
+            with op.get_context().autocommit_block():
+                op.execute(f"PRAGMA auto_vacuum = {SQLITE_AUTO_VACUUM_INCREMENTAL}")
+                op.execute("VACUUM")
+            bind.exec_driver_sql("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    # The database keeps incremental auto-vacuum, which older revisions do not depend on
+    op.drop_index("ix_run_archives_owner_id", table_name="run_archives")
+    op.drop_index("ix_run_archives_subreddit_id", table_name="run_archives")
+    op.drop_table("run_archives")
+    with op.batch_alter_table("runs") as batch_op:
+        batch_op.drop_column("restored_at")
+    with op.batch_alter_table("subreddits") as batch_op:
+        batch_op.drop_column("retention_runs")
+        batch_op.drop_column("retention_days")
@@ -0,0 +1,56 @@
+"""Store metadata as JSONB with GIN indexes on Postgres
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-07-27 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+METADATA_COLUMNS = [
+    ("documents", "doc_metadata"),
+    ("run_documents", "doc_metadata"),
+    ("ai_generated_comments", "comment_metadata"),
+]
+
+# Containment (`@>`) is the only operator jsonb_path_ops supports, for smaller and faster indexes
+GIN_INDEXES = {
+    "ix_documents_doc_metadata": ("documents", "doc_metadata"),
+    "ix_ai_generated_comments_comment_metadata": ("ai_generated_comments", "comment_metadata"),
+}
+
+
+def upgrade():
+    # SQLite keeps JSON as text either way
+    if op.get_context().dialect.name != "postgresql":
+        return
+
+    for table, column in METADATA_COLUMNS:
+        op.alter_column(
+            table, column, existing_type=sa.JSON(), type_=postgresql.JSONB(), existing_nullable=True,
+            postgresql_using=f"{column}::jsonb"
+        )
+    for name, (table, column) in GIN_INDEXES.items():
+        op.create_index(name, table, [column], postgresql_using="gin", postgresql_ops={column: "jsonb_path_ops"})
+
+
+def downgrade():
+    if op.get_context().dialect.name != "postgresql":
+        return
+
+    for name, (table, _) in GIN_INDEXES.items():
+        op.drop_index(name, table_name=table)
+    for table, column in METADATA_COLUMNS:
+        op.alter_column(
+            table, column, existing_type=postgresql.JSONB(), type_=sa.JSON(), existing_nullable=True,
+            postgresql_using=f"{column}::json"
+        )
@@ -0,0 +1,67 @@
+"""Index the owner of each document in the SQLite full-text search index
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-07-28 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+DROP_SEARCH_INDEX = [
+    "DROP TRIGGER IF EXISTS documents_fts_update",
+    "DROP TRIGGER IF EXISTS documents_fts_delete",
+    "DROP TRIGGER IF EXISTS documents_fts_insert",
+    "DROP TABLE IF EXISTS documents_fts",
+]
+
+
+def _search_ddl(columns):
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"""CREATE VIRTUAL TABLE documents_fts USING fts5(
+            {names}, content='documents', content_rowid='rowid', tokenize='porter unicode61'
+        )""",
+        f"""CREATE TRIGGER documents_fts_insert AFTER INSERT ON documents BEGIN
+            INSERT INTO documents_fts(rowid, {names}) VALUES (new.rowid, {new});
+        END""",
+        f"""CREATE TRIGGER documents_fts_delete AFTER DELETE ON documents BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, {names}) VALUES ('delete', old.rowid, {old});
+        END""",
+        f"""CREATE TRIGGER documents_fts_update AFTER UPDATE OF {names} ON documents BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, {names}) VALUES ('delete', old.rowid, {old});
+            INSERT INTO documents_fts(rowid, {names}) VALUES (new.rowid, {new});
+        END""",
+    ]
+
+
+def _replace_search_index(ddl):
+    # FTS5 columns cannot be altered, so the index is dropped and rebuilt from documents
+    bind = op.get_bind()
+    for statement in DROP_SEARCH_INDEX + ddl + ["INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')"]:
+        bind.exec_driver_sql(statement)
+
+
+def upgrade():
+    # Postgres filters on the owner_id column before ranking already
+    if op.get_context().dialect.name != "sqlite":
+        return
+    # The owner column matches on its own and takes no part in ranking
+    _replace_search_index(
+        _search_ddl(["title", "content", "owner_id"])
+        + ["INSERT INTO documents_fts(documents_fts, rank) VALUES ('rank', 'bm25(1.0, 1.0, 0.0)')"]
+    )
+
+
+def downgrade():
+    if op.get_context().dialect.name != "sqlite":
+        return
+    _replace_search_index(_search_ddl(["title", "content"]))
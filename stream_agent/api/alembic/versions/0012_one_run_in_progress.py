@@ -0,0 +1,52 @@
+"""Allow at most one run in progress per subreddit
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2025-07-29 00:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+runs = sa.table(
+    "runs",
+    sa.column("id", sa.String), sa.column("subreddit_id", sa.String), sa.column("created_at", sa.DateTime),
+    sa.column("status", sa.String), sa.column("updated_at", sa.DateTime),
+)
+
+
+def upgrade():
+    # Overlapping runs started before the index existed: the latest one per subreddit stays in progress
+    bind = op.get_bind()
+    in_progress = bind.execute(
+        sa.select(runs.c.id, runs.c.subreddit_id)
+        .where(runs.c.status == "in_progress")
+        .order_by(runs.c.subreddit_id, runs.c.created_at.desc(), runs.c.id.desc())
+    ).all()
+    kept, overlapping = set(), []
+    for run_id, subreddit_id in in_progress:
+        if subreddit_id in kept:
+            overlapping.append(run_id)
+        kept.add(subreddit_id)
+    if overlapping:
+        bind.execute(
+            runs.update().where(runs.c.id.in_(overlapping)).values(status="failed", updated_at=datetime.utcnow())
+        )
+
+    op.create_index(
+        "ix_runs_subreddit_id_in_progress", "runs", ["subreddit_id"], unique=True,
+        sqlite_where=sa.text("status = 'in_progress'"), postgresql_where=sa.text("status = 'in_progress'"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_runs_subreddit_id_in_progress", table_name="runs")
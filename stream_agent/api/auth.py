@@ -1,28 +1,52 @@
+import asyncio
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from stream_agent.api.schemas import TokenData, User
 from stream_agent.api.models import User as UserModel
 from stream_agent.api.database import get_db
+from stream_agent.api.cache import TTLCache
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; hashes made with any other cost are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt is CPU-bound, so it runs on its own bounded pool instead of the event loop
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 
 # JWT token scheme
 security = HTTPBearer()
 
+# Caches for decoded tokens (keyed by token) and authenticated users (keyed by username)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
@@ -34,6 +58,23 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the password hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password on the password hashing pool.
+
+    Returns whether it matched and, if the hash uses an outdated cost, a replacement hash.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -49,6 +90,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def verify_token(token: str) -> TokenData:
     """Verify a JWT token and return token data."""
+    token_data = token_cache.get(token)
+    if token_data is not None:
+        return token_data
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -58,7 +103,12 @@ def verify_token(token: str) -> TokenData:
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return TokenData(username=username)
+        token_data = TokenData(username=username)
+
+        # Never serve a token from the cache past its expiry
+        expires_at = payload.get("exp")
+        token_cache.set(token, token_data, ttl=expires_at - time.time() if expires_at else None)
+        return token_data
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,44 +117,66 @@ def verify_token(token: str) -> TokenData:
         )
 
 
-def get_user_by_username(db: Session, username: str) -> Optional[UserModel]:
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[UserModel]:
     """Get user by username from database."""
-    return db.query(UserModel).filter(UserModel.username == username).first()
+    result = await db.execute(select(UserModel).where(UserModel.username == username))
+    return result.scalars().first()
 
 
-def get_user_by_email(db: Session, email: str) -> Optional[UserModel]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[UserModel]:
     """Get user by email from database."""
-    return db.query(UserModel).filter(UserModel.email == email).first()
+    result = await db.execute(select(UserModel).where(UserModel.email == email))
+    return result.scalars().first()
 
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[UserModel]:
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[UserModel]:
     """Authenticate a user with username and password."""
-    user = get_user_by_username(db, username)
+    user = await get_user_by_username(db, username)
     if user is None:
         return None
 
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not verified:
         return None
 
+    if new_hash is not None:
+        # BCRYPT_ROUNDS changed since this hash was made
+        user.hashed_password = new_hash
+        await db.commit()
+        invalidate_user(user.username)
+
     return user
 
 
-def get_current_user(
+def invalidate_user(username: str):
+    """Drop a user from the cache after it changes."""
+    user_cache.pop(username)
+
+
+def auth_cache_stats() -> dict:
+    """Hit/miss counters of the authentication caches."""
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> UserModel:
     """Get the current user from the JWT token."""
     token = credentials.credentials
     token_data = verify_token(token)
 
-    # Find user in database
-    user = get_user_by_username(db, token_data.username)
+    # Find user in the cache, then in the database
+    user = user_cache.get(token_data.username)
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        user = await get_user_by_username(db, token_data.username)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user_cache.set(token_data.username, user)
 
     if not user.is_active:
         raise HTTPException(
@@ -1,4 +1,8 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -6,22 +10,117 @@ import os
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./stream_agent.db")
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Async drivers used by the API for each supported backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+
+# Sync drivers used by migrations and scripts; both Postgres drivers come with the postgres extra
+SYNC_DRIVERS = {
+    "postgres": "postgresql+psycopg",
+    "postgresql": "postgresql+psycopg",
+}
+
+
+def _with_driver(database_url: str, drivers: Dict[str, str]) -> str:
+    url = make_url(database_url)
+    if url.drivername in drivers:
+        url = url.set(drivername=drivers[url.drivername])
+    return url.render_as_string(hide_password=False)
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Return the async driver variant of a database URL."""
+    return _with_driver(database_url, ASYNC_DRIVERS)
+
+
+def get_sync_database_url(database_url: str) -> str:
+    """Return the sync driver variant of a database URL, leaving an explicit driver as it is."""
+    return _with_driver(database_url, SYNC_DRIVERS)
+
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+SYNC_DATABASE_URL = get_sync_database_url(DATABASE_URL)
+
+# Migrate the database when the app starts; disable when `python -m stream_agent.api.init_db` runs as a deploy step
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Connection pool settings, applied to both the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+
+# Pragmas run on every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are in KiB rather than pages
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", str(-64 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+}
+
+
+def get_engine_options(database_url: str) -> Dict[str, Any]:
+    """Keyword arguments for create_engine/create_async_engine for a database URL."""
+    url = make_url(database_url)
+    options: Dict[str, Any] = {}
+
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        # In-memory databases use a single shared connection rather than a pool
+        if url.database in (None, "", ":memory:"):
+            return options
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    return options
+
+
+def set_sqlite_pragmas(engine: Engine, pragmas: Dict[str, Any] = SQLITE_PRAGMAS):
+    """Run the given pragmas on every connection the engine opens."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+# Create SQLAlchemy engine (used for schema creation and scripts)
+engine = create_engine(SYNC_DATABASE_URL, **get_engine_options(SYNC_DATABASE_URL))
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create async engine and session factory (used by the API)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_engine_options(ASYNC_DATABASE_URL))
+
+if make_url(DATABASE_URL).get_backend_name() == "sqlite":
+    set_sqlite_pragmas(engine)
+    set_sqlite_pragmas(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class
 Base = declarative_base()
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,71 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Responses are per user and must be revalidated before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts: Any) -> str:
+    """Weak ETag built from the given version markers."""
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+async def resource_etag(
+    db: AsyncSession,
+    model: Any,
+    resource_id: str,
+    owner_id: str,
+    child_key: Any,
+    child_version: Any,
+    version_join: Any = None
+) -> Optional[str]:
+    """ETag of an owned row and its children, or None if the row is not found.
+
+    Only version markers are read: the row's updated_at plus the number of
+    children and their latest version, so no content is loaded. When the
+    version lives on a row the children link to, version_join joins it.
+    """
+    query = (
+        select(model.updated_at, func.count(child_key), func.max(child_version))
+        .outerjoin(child_key.class_, child_key == model.id)
+    )
+    if version_join is not None:
+        query = query.outerjoin(child_version.class_, version_join)
+    result = await db.execute(
+        query
+        .where(model.id == resource_id, model.owner_id == owner_id)
+        .group_by(model.id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return weak_etag(model.__tablename__, resource_id, *row)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header matches the ETag (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def set_cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = "Authorization"
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a client that already has the current representation."""
+    response = Response(status_code=304)
+    set_cache_headers(response, etag)
+    return response
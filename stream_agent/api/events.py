@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from stream_agent.api.cache import TTLCache
+
+# Seconds between keep-alive comments on an idle event stream
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+
+# Finished runs whose events are kept for late subscribers, and for how long (seconds)
+RUN_EVENTS_RETAINED = int(os.getenv("RUN_EVENTS_RETAINED", "1024"))
+RUN_EVENTS_TTL = float(os.getenv("RUN_EVENTS_TTL", "300"))
+
+# (id, event type, data); the id is None for events that are not replayable
+Event = Tuple[Optional[int], str, Dict[str, Any]]
+
+
+def format_sse(event: Event) -> str:
+    """Encode an event in the text/event-stream format."""
+    event_id, event_type, data = event
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+class _Channel:
+    def __init__(self):
+        self.history: List[Event] = []
+        self.subscribers: Set[asyncio.Queue] = set()
+
+
+class RunEventBroker:
+    """In-process fan-out of pipeline events to the clients watching each run.
+
+    Events of a running run are kept so late subscribers can replay them, and
+    those of finished runs are retained for a while after the run is closed.
+    """
+
+    def __init__(self, retained: int = RUN_EVENTS_RETAINED, ttl: float = RUN_EVENTS_TTL):
+        self._channels: Dict[str, _Channel] = {}
+        self._finished = TTLCache(maxsize=retained, ttl=ttl)
+
+    def publish(self, run_id: str, event_type: str, data: Dict[str, Any]):
+        """Record an event for a run and deliver it to its subscribers."""
+        channel = self._channels.setdefault(run_id, _Channel())
+        event = (len(channel.history) + 1, event_type, data)
+        channel.history.append(event)
+        for queue in channel.subscribers:
+            queue.put_nowait(event)
+
+    def close(self, run_id: str):
+        """End the streams of a finished run."""
+        channel = self._channels.pop(run_id, None)
+        if channel is None:
+            return
+        self._finished.set(run_id, channel.history)
+        for queue in channel.subscribers:
+            queue.put_nowait(None)
+
+    def is_active(self, run_id: str) -> bool:
+        """Whether the run is publishing events in this process."""
+        channel = self._channels.get(run_id)
+        return channel is not None and bool(channel.history)
+
+    def finished_events(self, run_id: str) -> Optional[List[Event]]:
+        """Events of a recently finished run, or None if none are retained."""
+        return self._finished.get(run_id)
+
+    async def subscribe(self, run_id: str, after: int = 0, timeout: Optional[float] = None) -> AsyncIterator[Optional[Event]]:
+        """Yield a run's events after the given id until the run is closed.
+
+        Yields None whenever `timeout` seconds pass without an event.
+        """
+        history = self.finished_events(run_id)
+        if history is not None:
+            for event in history[after:]:
+                yield event
+            return
+
+        channel = self._channels.setdefault(run_id, _Channel())
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in channel.history[after:]:
+            queue.put_nowait(event)
+        channel.subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            channel.subscribers.discard(queue)
+            # Drop channels that only existed for this subscriber
+            if not channel.subscribers and not channel.history and self._channels.get(run_id) is channel:
+                del self._channels[run_id]
+
+
+run_events = RunEventBroker()
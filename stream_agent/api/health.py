@@ -0,0 +1,49 @@
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select, func
+
+from stream_agent.api.database import AsyncSessionLocal
+from stream_agent.api.periodic import PeriodicTask
+from stream_agent.api.models import (
+    Subreddit as SubredditModel, Document as DocumentModel, AIGeneratedComment as CommentModel
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds between refreshes of the entity counts reported by /health
+HEALTH_STATS_INTERVAL = float(os.getenv("HEALTH_STATS_INTERVAL", "60"))
+
+
+class StatsSnapshot(PeriodicTask):
+    """Entity counts refreshed in the background so health checks never query the tables."""
+
+    name = "stats-snapshot"
+
+    def __init__(self, interval: float = HEALTH_STATS_INTERVAL):
+        super().__init__(interval)
+        self.counts: Dict[str, Optional[int]] = {
+            "subreddits_count": None,
+            "documents_count": None,
+            "comments_count": None,
+        }
+        self.updated_at: Optional[datetime] = None
+
+    async def refresh(self):
+        """Recount the entities and replace the snapshot."""
+        async with AsyncSessionLocal() as db:
+            counts = {
+                "subreddits_count": await db.scalar(select(func.count()).select_from(SubredditModel)),
+                "documents_count": await db.scalar(select(func.count()).select_from(DocumentModel)),
+                "comments_count": await db.scalar(select(func.count()).select_from(CommentModel)),
+            }
+        self.counts = counts
+        self.updated_at = datetime.now()
+
+    async def run_once(self):
+        await self.refresh()
+
+
+stats_snapshot = StatsSnapshot()
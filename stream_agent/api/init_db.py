@@ -1,28 +1,70 @@
-from sqlalchemy import create_engine
-from stream_agent.api.database import Base, DATABASE_URL
-from stream_agent.api.models import User, Subreddit, Run, Document, AIGeneratedComment
+from contextlib import contextmanager
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import make_url
+
+from stream_agent.api.database import SYNC_DATABASE_URL, engine
 import logging
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, which then migrates without the lock
+    fcntl = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ALEMBIC_INI = Path(__file__).with_name("alembic.ini")
+
+# Revision matching the schema that create_all produced before migrations existed
+BASELINE_REVISION = "0001"
+
+
+def get_alembic_config() -> Config:
+    """Alembic configuration for the API database."""
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+@contextmanager
+def migration_lock():
+    """Hold a lock file next to a SQLite database, so workers starting together migrate one at a time.
+
+    Postgres migrations take an advisory lock in alembic/env.py instead.
+    """
+    url = make_url(SYNC_DATABASE_URL)
+    if fcntl is None or url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        yield
+        return
+    with open(f"{url.database}.migrate.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 
 def create_tables():
-    """Create all database tables."""
-    logger.info("Creating database tables...")
+    """Create the database tables, or migrate existing ones to the latest revision."""
+    config = get_alembic_config()
 
-    # Create engine
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-    )
+    with migration_lock():
+        tables = inspect(engine).get_table_names()
+        if tables and "alembic_version" not in tables:
+            # Database created by create_all before migrations existed
+            logger.info(f"Stamping existing database at baseline revision {BASELINE_REVISION}")
+            command.stamp(config, BASELINE_REVISION)
 
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+        logger.info("Migrating database tables...")
+        command.upgrade(config, "head")
 
-    logger.info("Database tables created successfully!")
+    logger.info("Database tables are up to date!")
 
 
 if __name__ == "__main__":
-    create_tables()
\ No newline at end of file
+    create_tables()
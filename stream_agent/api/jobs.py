@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from sqlalchemy import update
+
+from stream_agent.api.database import AsyncSessionLocal
+from stream_agent.api.events import run_events
+from stream_agent.api.models import Subreddit as SubredditModel, Run as RunModel
+from stream_agent.api.periodic import PeriodicTask
+from stream_agent.api.persistence import complete_run, load_known_posts
+from stream_agent.common.metrics import observe_stage
+from stream_agent.common.progress import StageCallback, StageTimer
+from stream_agent.parser_agents.reddit.schemas import InputSchema
+
+logger = logging.getLogger(__name__)
+
+# Worker pool configuration
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", "4"))
+PROCESS_QUEUE_SIZE = int(os.getenv("PROCESS_QUEUE_SIZE", "100"))
+# Seconds after which a run still in progress is considered lost, e.g. to a crash, and marked failed
+RUN_STALE_TIMEOUT = float(os.getenv("RUN_STALE_TIMEOUT", "3600"))
+# Seconds between checks for stale runs
+RUN_STALE_CHECK_INTERVAL = float(os.getenv("RUN_STALE_CHECK_INTERVAL", "300"))
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted to a full queue."""
+
+
+class JobQueue:
+    """Bounded queue of coroutine jobs drained by a fixed number of workers.
+
+    Jobs are tagged with the run they process, so the runs of jobs dropped at
+    shutdown can be marked failed.
+    """
+
+    def __init__(self, workers: int = PROCESS_WORKERS, maxsize: int = PROCESS_QUEUE_SIZE):
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        """Start the worker tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} job workers (queue size {self.maxsize})")
+
+    async def stop(self):
+        """Cancel the workers, interrupting any job that is still running, and fail the runs of queued jobs."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        dropped = []
+        while self._queue is not None and not self._queue.empty():
+            _, run_id = self._queue.get_nowait()
+            if run_id is not None:
+                dropped.append(run_id)
+        self._queue = None
+        if dropped:
+            logger.warning(f"Dropping {len(dropped)} queued runs at shutdown")
+            await fail_runs(dropped, "Interrupted by shutdown")
+
+    def has_room(self, jobs: int) -> bool:
+        """Whether `jobs` more jobs can be submitted without filling the queue."""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        return self._queue.maxsize <= 0 or self._queue.qsize() + jobs <= self._queue.maxsize
+
+    def submit(self, job: Callable[[], Awaitable[None]], run_id: Optional[str] = None):
+        """Enqueue a job processing `run_id` without waiting, raising QueueFullError if there is no room."""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        try:
+            self._queue.put_nowait((job, run_id))
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full")
+
+    async def _worker(self, index: int):
+        while True:
+            job, _ = await self._queue.get()
+            try:
+                await job()
+            except Exception as e:
+                logger.exception(f"Job worker {index} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+job_queue = JobQueue()
+
+
+def to_input_schema(subreddit: SubredditModel) -> InputSchema:
+    """Convert a SubredditModel to the pipeline's InputSchema."""
+    return InputSchema(
+        subreddit=subreddit.subreddit,
+        time_range=subreddit.time_range,
+        limit=subreddit.limit,
+        target_number=subreddit.target_number,
+        audience_specification=subreddit.audience_specification,
+        subreddit_description=subreddit.subreddit_description
+    )
+
+
+async def _set_run_status(run_id: str, status: str):
+    async with AsyncSessionLocal() as db:
+        run = await db.get(RunModel, run_id)
+        if run is not None:
+            run.status = status
+            await db.commit()
+
+
+def _stage_publisher(run_id: str) -> StageCallback:
+    """Stage callback that publishes pipeline progress to the run's event stream and records stage timings."""
+    def on_stage(stage: str, status: str, elapsed: Optional[float]):
+        observe_stage(stage, status, elapsed)
+        data = {"stage": stage, "status": status}
+        if elapsed is not None:
+            data["elapsed_ms"] = round(elapsed * 1000, 1)
+        run_events.publish(run_id, "stage", data)
+    return on_stage
+
+
+def _finish_run_events(run_id: str, status: str, **data):
+    run_events.publish(run_id, "status", {"status": status, **data})
+    run_events.close(run_id)
+
+
+async def fail_runs(run_ids: Iterable[str], error: str):
+    """Mark runs that will never be processed as failed and end their event streams."""
+    run_ids = list(run_ids)
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(RunModel).where(RunModel.id.in_(run_ids), RunModel.status == "in_progress").values(status="failed"),
+            execution_options={"synchronize_session": False}
+        )
+        await db.commit()
+    for run_id in run_ids:
+        _finish_run_events(run_id, "failed", error=error)
+
+
+def stale_before(now: Optional[datetime] = None) -> datetime:
+    """Creation time before which a run still in progress is considered lost."""
+    return (now or datetime.utcnow()) - timedelta(seconds=RUN_STALE_TIMEOUT)
+
+
+async def fail_stale_runs(now: Optional[datetime] = None) -> int:
+    """Mark the runs in progress for longer than RUN_STALE_TIMEOUT as failed and return how many there were."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(RunModel)
+            .where(RunModel.status == "in_progress", RunModel.created_at < stale_before(now))
+            .values(status="failed"),
+            execution_options={"synchronize_session": False}
+        )
+        await db.commit()
+    if result.rowcount:
+        logger.warning(f"Marked {result.rowcount} stale in-progress runs as failed")
+    return result.rowcount
+
+
+class StaleRunReaper(PeriodicTask):
+    """Fails runs left in progress by a crashed or killed process, on startup and then periodically.
+
+    Each run's status is only updated by the process that runs it, so a run
+    whose process died would otherwise stay in progress forever, holding back
+    its subreddit, its batch and its event streams.
+    """
+
+    name = "stale-run-reaper"
+
+    def __init__(self, interval: float = RUN_STALE_CHECK_INTERVAL):
+        super().__init__(interval)
+
+    async def run_once(self):
+        await fail_stale_runs()
+
+
+stale_run_reaper = StaleRunReaper()
+
+
+async def process_run(run_id: str, input_schema: InputSchema):
+    """Run the Reddit pipeline for an in-progress run and record its outcome."""
+    # Imported on first use: the pipeline loads langchain, the LLM providers and the Arcade client
+    from stream_agent.parser_agents.reddit.agent import get_content
+
+    on_stage = _stage_publisher(run_id)
+    try:
+        async with AsyncSessionLocal() as db:
+            known_posts = await load_known_posts(db, run_id)
+        # Give up when the reaper would consider the run lost
+        async with asyncio.timeout(RUN_STALE_TIMEOUT):
+            documents = await get_content(input_schema, on_stage=on_stage, known_posts=known_posts)
+    except asyncio.CancelledError:
+        logger.warning(f"Run {run_id} interrupted by shutdown")
+        await _set_run_status(run_id, "failed")
+        _finish_run_events(run_id, "failed", error="Interrupted by shutdown")
+        raise
+    except TimeoutError:
+        logger.error(f"Run {run_id} of subreddit {input_schema.subreddit} timed out after {RUN_STALE_TIMEOUT}s")
+        await _set_run_status(run_id, "failed")
+        _finish_run_events(run_id, "failed", error="Timed out")
+        return
+    except Exception as e:
+        logger.error(f"Error processing subreddit {input_schema.subreddit} in run {run_id}: {e}")
+        await _set_run_status(run_id, "failed")
+        _finish_run_events(run_id, "failed", error="Fetching content failed")
+        return
+
+    stages = StageTimer(on_stage)
+    stages.enter("save")
+    async with AsyncSessionLocal() as db:
+        try:
+            document_ids = await complete_run(db, run_id, documents)
+        except Exception as e:
+            logger.error(f"Error saving documents for run {run_id}: {e}")
+            await _set_run_status(run_id, "failed")
+            _finish_run_events(run_id, "failed", error="Saving documents failed")
+            return
+    stages.finish()
+
+    if document_ids is None:
+        logger.info(f"Run {run_id} was deleted while processing, discarding {len(documents)} documents")
+        _finish_run_events(run_id, "deleted")
+        return
+
+    logger.info(f"Processed subreddit {input_schema.subreddit}: {len(document_ids)} documents saved in run {run_id}")
+    _finish_run_events(run_id, "completed", documents=len(document_ids))
+
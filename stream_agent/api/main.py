@@ -1,29 +1,57 @@
 import asyncio
+import functools
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from stream_agent.common.schemas import Document
-from stream_agent.api.schemas import SubredditConfig, AIGeneratedComment, UserCreate, UserLogin, User, Token
+from stream_agent.api.schemas import (
+    SubredditConfig, AIGeneratedComment, AIGeneratedCommentBatch, ProcessAllRequest, UserCreate, UserLogin, User, Token
+)
 from stream_agent.api.response_models import (
     SubredditResponse, DocumentResponse, CommentResponse, ProcessSubredditResponse,
-    UserResponse, RunResponse, SubredditWithRunsResponse, RunWithDocumentsResponse,
-    DocumentWithCommentsResponse
+    UserResponse, RunResponse, SubredditWithRunsResponse, RunWithDocumentsResponse, ProcessBatchResponse, ProcessBatchError,
+    BatchResponse,
+    DocumentWithCommentsResponse, RunPage, DocumentPage, CommentPage, CommentBatchResponse, CommentBatchError,
+    DocumentSearchResult, RunDocumentResponse, RunArchiveResponse
 )
 from stream_agent.api.models import (
     User as UserModel, Subreddit as SubredditModel, Run as RunModel,
-    Document as DocumentModel, AIGeneratedComment as CommentModel
+    Document as DocumentModel, RunDocument as RunDocumentModel, AIGeneratedComment as CommentModel,
+    RunArchive as RunArchiveModel
 )
-from stream_agent.api.database import get_db, engine, Base
+from stream_agent.api.database import DB_MIGRATE_ON_STARTUP, AsyncSessionLocal, async_engine, get_db
 from stream_agent.api.auth import (
-    authenticate_user, create_access_token, get_password_hash, get_current_user,
-    get_user_by_username, get_user_by_email
+    authenticate_user, create_access_token, hash_password_async, get_current_user,
+    get_user_by_username, get_user_by_email, invalidate_user, auth_cache_stats
+)
+from stream_agent.api.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NDJSON_RESPONSES, paginate, stream_ndjson, wants_ndjson
+)
+from stream_agent.api.persistence import new_run_name, delete_runs, run_in_progress
+from stream_agent.api.etags import resource_etag, etag_matches, not_modified, set_cache_headers
+from stream_agent.api.search import search_documents
+from stream_agent.api.compression import CompressionMiddleware
+from stream_agent.api.health import stats_snapshot
+from stream_agent.api.metrics import MetricsMiddleware, instrument_engine, metrics_response
+from stream_agent.api.ratelimit import rate_limit, rate_limiter
+from stream_agent.api.retention import (
+    RETENTION_ENABLED, RunExistsError, delete_archive_files, restore_run, retention_sweeper
+)
+from stream_agent.api.scheduler import SCHEDULER_ENABLED, first_run_at, scheduler
+from stream_agent.api.events import SSE_HEARTBEAT_INTERVAL, format_sse, run_events
+from stream_agent.api.jobs import (
+    job_queue, process_run, stale_before, stale_run_reaper, to_input_schema, QueueFullError
 )
-from stream_agent.parser_agents.reddit.agent import get_content, InputSchema
 import logging
 
 # Configure logging
@@ -34,14 +62,41 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Count and time the queries of requests and runs
+instrument_engine(async_engine.sync_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Migrate the database, then start the background workers for the lifetime of the app."""
+    if DB_MIGRATE_ON_STARTUP:
+        # Imported here so workers of deployments that migrate in a separate step never load alembic
+        from stream_agent.api.init_db import create_tables
+        # Off the event loop, as migrating a large database can take a while
+        await asyncio.to_thread(create_tables)
+    job_queue.start()
+    stale_run_reaper.start()
+    stats_snapshot.start()
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    if RETENTION_ENABLED:
+        retention_sweeper.start()
+    yield
+    await retention_sweeper.stop()
+    await scheduler.stop()
+    await stats_snapshot.stop()
+    await stale_run_reaper.stop()
+    await job_queue.stop()
+    await rate_limiter.close()
+    # Close pooled connections so their driver threads do not outlive the app
+    await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
     title="Stream Agent API",
     description="API for managing subreddits, documents, and AI-generated comments",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -53,19 +108,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses with zstd or gzip
+app.add_middleware(CompressionMiddleware)
+
+# Record request latencies, including compression
+app.add_middleware(MetricsMiddleware)
+
 # Authentication endpoints
 @app.post("/auth/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
     # Check if username already exists
-    if get_user_by_username(db, user_data.username):
+    if await get_user_by_username(db, user_data.username):
         raise HTTPException(
             status_code=400,
             detail="Username already registered"
         )
 
     # Check if email already exists
-    if get_user_by_email(db, user_data.email):
+    if await get_user_by_email(db, user_data.email):
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
@@ -73,7 +134,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
     # Create new user
     user_id = str(uuid.uuid4())
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
 
     user = UserModel(
         id=user_id,
@@ -84,17 +145,18 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    invalidate_user(user.username)
 
     logger.info(f"Registered new user: {user_data.username}")
     return UserResponse.from_orm(user)
 
 
 @app.post("/auth/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login and get access token."""
-    user = authenticate_user(db, user_data.username, user_data.password)
+    user = await authenticate_user(db, user_data.username, user_data.password)
     if not user:
         raise HTTPException(
             status_code=401,
@@ -116,12 +178,35 @@ async def get_current_user_info(current_user: UserModel = Depends(get_current_us
     """Get current user information."""
     return UserResponse.from_orm(current_user)
 
+def to_run_with_documents_response(run: RunModel) -> RunWithDocumentsResponse:
+    """Convert a run and its document links, in rank order, to a RunWithDocumentsResponse."""
+    return RunWithDocumentsResponse(
+        id=run.id,
+        name=run.name,
+        subreddit_id=run.subreddit_id,
+        created_at=run.created_at,
+        status=run.status,
+        documents=[
+            RunDocumentResponse(
+                id=link.document.id,
+                title=link.document.title,
+                content=link.document.content,
+                url=link.document.url,
+                created_at=link.document.created_at,
+                doc_metadata=link.doc_metadata,  # As seen by this run
+                run_id=link.run_id,
+                rank=link.rank
+            )
+            for link in run.document_links
+        ]
+    )
+
 # Subreddit endpoints
 @app.post("/subreddits/", response_model=SubredditResponse)
 async def add_subreddit(
     config: SubredditConfig,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Add a new subreddit configuration."""
     subreddit_id = str(uuid.uuid4())
@@ -134,12 +219,18 @@ async def add_subreddit(
         target_number=config.target_number,
         audience_specification=config.audience_specification,
         subreddit_description=config.subreddit_description,
+        incremental=config.incremental,
+        active=config.active,
+        schedule_minutes=config.schedule_minutes,
+        next_run_at=first_run_at(config.schedule_minutes),
+        retention_days=config.retention_days,
+        retention_runs=config.retention_runs,
         owner_id=current_user.id
     )
 
     db.add(subreddit)
-    db.commit()
-    db.refresh(subreddit)
+    await db.commit()
+    await db.refresh(subreddit)
 
     logger.info(f"Added subreddit: {config.subreddit} by user: {current_user.username}")
     return SubredditResponse.from_orm(subreddit)
@@ -147,27 +238,39 @@ async def add_subreddit(
 @app.get("/subreddits/", response_model=List[SubredditResponse])
 async def get_subreddits(
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all subreddit configurations for the current user."""
-    subreddits = db.query(SubredditModel).filter(SubredditModel.owner_id == current_user.id).all()
+    result = await db.execute(select(SubredditModel).where(SubredditModel.owner_id == current_user.id))
+    subreddits = result.scalars().all()
     return [SubredditResponse.from_orm(subreddit) for subreddit in subreddits]
 
 @app.get("/subreddits/{subreddit_id}", response_model=SubredditWithRunsResponse)
 async def get_subreddit(
     subreddit_id: str,
+    request: Request,
+    response: Response,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific subreddit configuration with its runs."""
-    subreddit = db.query(SubredditModel).filter(
+    # Computed before loading so a concurrent change can only make the tag stale, never the body
+    etag = await resource_etag(db, SubredditModel, subreddit_id, current_user.id, RunModel.subreddit_id, RunModel.updated_at)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Subreddit not found")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    result = await db.execute(select(SubredditModel).options(selectinload(SubredditModel.runs)).where(
         SubredditModel.id == subreddit_id,
         SubredditModel.owner_id == current_user.id
-    ).first()
+    ))
+    subreddit = result.scalars().first()
 
     if not subreddit:
         raise HTTPException(status_code=404, detail="Subreddit not found")
 
+    set_cache_headers(response, etag)
     return SubredditWithRunsResponse.from_orm(subreddit)
 
 @app.put("/subreddits/{subreddit_id}", response_model=SubredditResponse)
@@ -175,13 +278,14 @@ async def update_subreddit(
     subreddit_id: str,
     config: SubredditConfig,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a subreddit configuration."""
-    subreddit = db.query(SubredditModel).filter(
+    result = await db.execute(select(SubredditModel).where(
         SubredditModel.id == subreddit_id,
         SubredditModel.owner_id == current_user.id
-    ).first()
+    ))
+    subreddit = result.scalars().first()
 
     if not subreddit:
         raise HTTPException(status_code=404, detail="Subreddit not found")
@@ -192,9 +296,16 @@ async def update_subreddit(
     subreddit.target_number = config.target_number
     subreddit.audience_specification = config.audience_specification
     subreddit.subreddit_description = config.subreddit_description
+    subreddit.incremental = config.incremental
+    subreddit.active = config.active
+    if config.schedule_minutes != subreddit.schedule_minutes:
+        subreddit.schedule_minutes = config.schedule_minutes
+        subreddit.next_run_at = first_run_at(config.schedule_minutes)
+    subreddit.retention_days = config.retention_days
+    subreddit.retention_runs = config.retention_runs
 
-    db.commit()
-    db.refresh(subreddit)
+    await db.commit()
+    await db.refresh(subreddit)
 
     logger.info(f"Updated subreddit: {config.subreddit} by user: {current_user.username}")
     return SubredditResponse.from_orm(subreddit)
@@ -203,194 +314,472 @@ async def update_subreddit(
 async def delete_subreddit(
     subreddit_id: str,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a subreddit configuration."""
-    subreddit = db.query(SubredditModel).filter(
+    result = await db.execute(select(SubredditModel).where(
         SubredditModel.id == subreddit_id,
         SubredditModel.owner_id == current_user.id
-    ).first()
+    ))
+    subreddit = result.scalars().first()
 
     if not subreddit:
         raise HTTPException(status_code=404, detail="Subreddit not found")
 
     subreddit_name = subreddit.subreddit
-    db.delete(subreddit)
-    db.commit()
+    run_ids = (await db.scalars(select(RunModel.id).where(RunModel.subreddit_id == subreddit.id))).all()
+    await delete_runs(db, list(run_ids))
+    archive_paths = (await db.scalars(select(RunArchiveModel.path).where(RunArchiveModel.subreddit_id == subreddit.id))).all()
+    await db.delete(subreddit)
+    await db.commit()
+    # Only once the archives' rows are gone
+    delete_archive_files(archive_paths)
 
     logger.info(f"Deleted subreddit: {subreddit_name} by user: {current_user.username}")
     return {"message": f"Subreddit {subreddit_name} deleted successfully"}
 
-@app.post("/subreddits/{subreddit_id}/process", response_model=ProcessSubredditResponse)
+@app.post(
+    "/subreddits/{subreddit_id}/process",
+    response_model=ProcessSubredditResponse,
+    status_code=202
+)
 async def process_subreddit(
     subreddit_id: str,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Process a subreddit and save the documents in a new run."""
-    subreddit = db.query(SubredditModel).filter(
+    """Start processing a subreddit in the background and return the new run."""
+    result = await db.execute(select(SubredditModel).where(
         SubredditModel.id == subreddit_id,
         SubredditModel.owner_id == current_user.id
-    ).first()
+    ))
+    subreddit = result.scalars().first()
 
     if not subreddit:
         raise HTTPException(status_code=404, detail="Subreddit not found")
+    if await db.scalar(select(run_in_progress(subreddit_id))):
+        raise HTTPException(status_code=409, detail="Subreddit has a run in progress")
+    if not job_queue.has_room(1):
+        raise HTTPException(
+            status_code=503,
+            detail="Processing queue is full, try again later",
+            headers={"Retry-After": "30"}
+        )
+    # Charged only for requests that start a run, as in process-all
+    await rate_limiter.hit("process", current_user.id)
 
-    # Convert SubredditModel to InputSchema
-    input_schema = InputSchema(
-        subreddit=subreddit.subreddit,
-        time_range=subreddit.time_range,
-        limit=subreddit.limit,
-        target_number=subreddit.target_number,
-        audience_specification=subreddit.audience_specification,
-        subreddit_description=subreddit.subreddit_description
+    input_schema = to_input_schema(subreddit)
+
+    # Create the run up front so clients can poll its status
+    run_id = str(uuid.uuid4())
+    run_name = new_run_name()
+
+    run = RunModel(
+        id=run_id,
+        name=run_name,
+        subreddit_id=subreddit_id,
+        owner_id=current_user.id,
+        status="in_progress"
     )
 
+    db.add(run)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another request started a run since the check above
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Subreddit has a run in progress")
+
     try:
-        # Get content from the subreddit
-        documents = await get_content(input_schema)
-
-        # Create a new run
-        run_id = str(uuid.uuid4())
-        run_name = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        run = RunModel(
-            id=run_id,
-            name=run_name,
-            subreddit_id=subreddit_id,
-            status="completed"
+        job_queue.submit(functools.partial(process_run, run_id, input_schema), run_id)
+    except QueueFullError:
+        # Filled up by other requests since the check above
+        await db.delete(run)
+        await db.commit()
+        raise HTTPException(
+            status_code=503,
+            detail="Processing queue is full, try again later",
+            headers={"Retry-After": "30"}
         )
 
-        db.add(run)
-        db.commit()
-        db.refresh(run)
-
-        # Save documents to the run
-        document_ids = []
-        for doc in documents:
-            doc_id = str(uuid.uuid4())
-            document = DocumentModel(
-                id=doc_id,
-                title=doc.title,
-                content=doc.content,
-                url=str(doc.url),  # Convert HttpUrl to string
-                doc_metadata=doc.metadata,
-                run_id=run_id
-            )
-            db.add(document)
-            document_ids.append(doc_id)
+    logger.info(f"Queued subreddit {subreddit.subreddit} for processing in run {run_name}")
 
-        db.commit()
+    return ProcessSubredditResponse(
+        subreddit=subreddit.subreddit,
+        run_id=run_id,
+        status=run.status
+    )
 
-        logger.info(f"Processed subreddit {subreddit.subreddit}: {len(documents)} documents saved in run {run_name}")
+@app.post("/subreddits/process-all", response_model=ProcessBatchResponse, status_code=202)
+async def process_all_subreddits(
+    process_request: Optional[ProcessAllRequest] = None,
+    current_user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Start processing all active (or the selected) subreddits as one batch."""
+    query = select(SubredditModel).where(SubredditModel.owner_id == current_user.id)
+    subreddit_ids = process_request.subreddit_ids if process_request else None
+    if subreddit_ids is not None:
+        query = query.where(SubredditModel.id.in_(subreddit_ids))
+    else:
+        query = query.where(SubredditModel.active.is_(True))
+
+    result = await db.execute(
+        query.add_columns(run_in_progress(SubredditModel.id)).order_by(SubredditModel.created_at, SubredditModel.id)
+    )
+    rows = result.all()
+
+    if subreddit_ids is not None and len(rows) != len(set(subreddit_ids)):
+        raise HTTPException(status_code=404, detail="Subreddit not found")
+    if not rows:
+        raise HTTPException(status_code=400, detail="No subreddits to process")
+
+    # Subreddits with a run in progress are skipped rather than run twice at once
+    subreddits = [subreddit for subreddit, busy in rows if not busy]
+    errors = [
+        ProcessBatchError(subreddit_id=subreddit.id, subreddit=subreddit.subreddit, detail="Subreddit has a run in progress")
+        for subreddit, busy in rows if busy
+    ]
+    if not subreddits:
+        raise HTTPException(status_code=409, detail="Every subreddit has a run in progress")
+    if not job_queue.has_room(len(subreddits)):
+        raise HTTPException(
+            status_code=503,
+            detail="Processing queue is full, try again later",
+            headers={"Retry-After": "30"}
+        )
 
-        return ProcessSubredditResponse(
-            subreddit=subreddit.subreddit,
-            run_id=run_id,
-            documents_count=len(documents),
-            document_ids=document_ids
+    # Each subreddit of the batch costs as much as processing it on its own
+    await rate_limiter.hit("process", current_user.id, cost=len(subreddits))
+
+    # Create all runs up front so clients can poll the batch
+    batch_id = str(uuid.uuid4())
+    runs = [
+        RunModel(
+            id=str(uuid.uuid4()),
+            name=new_run_name(),
+            subreddit_id=subreddit.id,
+            owner_id=current_user.id,
+            status="in_progress",
+            batch_id=batch_id
         )
-    except Exception as e:
-        logger.error(f"Error processing subreddit {subreddit.subreddit}: {e}")
-        raise HTTPException(status_code=500, detail=f"Error processing subreddit: {str(e)}")
+        for subreddit in subreddits
+    ]
+
+    db.add_all(runs)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another request started one of the subreddits since the check above; a retry skips it
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="A subreddit of the batch has a run in progress")
+
+    if not job_queue.has_room(len(runs)):
+        # Filled up by other requests since the check above
+        for run in runs:
+            await db.delete(run)
+        await db.commit()
+        raise HTTPException(
+            status_code=503,
+            detail="Processing queue is full, try again later",
+            headers={"Retry-After": "30"}
+        )
+    # One job per run, so the batch shares the workers with every other run
+    for run, subreddit in zip(runs, subreddits):
+        job_queue.submit(functools.partial(process_run, run.id, to_input_schema(subreddit)), run.id)
+
+    logger.info(f"Queued {len(runs)} subreddits for processing in batch {batch_id}")
+
+    return ProcessBatchResponse(
+        batch_id=batch_id,
+        runs=[
+            ProcessSubredditResponse(subreddit=subreddit.subreddit, run_id=run.id, status=run.status)
+            for run, subreddit in zip(runs, subreddits)
+        ],
+        errors=errors
+    )
+
+@app.get("/batches/{batch_id}", response_model=BatchResponse)
+async def get_batch(
+    batch_id: str,
+    current_user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the runs of a processing batch and its overall status."""
+    result = await db.execute(select(RunModel).where(
+        RunModel.batch_id == batch_id,
+        RunModel.owner_id == current_user.id
+    ).order_by(RunModel.created_at, RunModel.id))
+    runs = result.scalars().all()
+
+    if not runs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    counts: Dict[str, int] = {}
+    for run in runs:
+        counts[run.status] = counts.get(run.status, 0) + 1
+
+    if counts.get("in_progress"):
+        status = "in_progress"
+    elif counts.get("failed") == len(runs):
+        status = "failed"
+    else:
+        status = "completed"
+
+    return BatchResponse(
+        batch_id=batch_id,
+        status=status,
+        counts=counts,
+        runs=[RunResponse.from_orm(run) for run in runs]
+    )
 
 # Run endpoints
-@app.get("/runs/", response_model=List[RunResponse])
+@app.get("/runs/", response_model=RunPage, responses=NDJSON_RESPONSES)
 async def get_runs(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all runs for the current user's subreddits."""
-    runs = db.query(RunModel).join(SubredditModel).filter(
-        SubredditModel.owner_id == current_user.id
-    ).all()
-    return [RunResponse.from_orm(run) for run in runs]
+    """Get a page of runs for the current user's subreddits, or stream them all as NDJSON."""
+    query = select(RunModel).where(
+        RunModel.owner_id == current_user.id
+    )
+    if wants_ndjson(request):
+        return stream_ndjson(query, RunModel, RunResponse, cursor)
+
+    runs, next_cursor = await paginate(db, query, RunModel, cursor, limit)
+    return RunPage(items=[RunResponse.from_orm(run) for run in runs], next_cursor=next_cursor)
 
 @app.get("/runs/{run_id}", response_model=RunWithDocumentsResponse)
 async def get_run(
     run_id: str,
+    request: Request,
+    response: Response,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific run with its documents."""
-    run = db.query(RunModel).join(SubredditModel).filter(
+    etag = await resource_etag(
+        db, RunModel, run_id, current_user.id, RunDocumentModel.run_id, DocumentModel.updated_at,
+        version_join=RunDocumentModel.document_id == DocumentModel.id
+    )
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    result = await db.execute(select(RunModel).options(
+        selectinload(RunModel.document_links).selectinload(RunDocumentModel.document)
+    ).where(
         RunModel.id == run_id,
-        SubredditModel.owner_id == current_user.id
-    ).first()
+        RunModel.owner_id == current_user.id
+    ))
+    run = result.scalars().first()
 
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
 
-    return RunWithDocumentsResponse.from_orm(run)
+    set_cache_headers(response, etag)
+    return to_run_with_documents_response(run)
+
+@app.get("/runs/{run_id}/events", responses={200: {"content": {"text/event-stream": {}}}})
+async def get_run_events(
+    run_id: str,
+    last_event_id: Optional[int] = Header(None),
+    current_user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream a run's stage transitions and timings as Server-Sent Events until it finishes."""
+    run = (await db.execute(select(RunModel.status, RunModel.created_at).where(
+        RunModel.id == run_id,
+        RunModel.owner_id == current_user.id
+    ))).first()
+
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    def final_status(status: Optional[str]) -> Optional[str]:
+        """The status to end the stream with, or None while the run can still make progress."""
+        if status != "in_progress":
+            return status or "deleted"
+        # In progress past the stale cutoff: its process is gone and the reaper will fail it
+        return "failed" if run.created_at < stale_before() else None
+
+    async def run_status() -> Optional[str]:
+        async with AsyncSessionLocal() as session:
+            return await session.scalar(select(RunModel.status).where(RunModel.id == run_id))
+
+    async def event_stream():
+        tracked = (
+            final_status(run.status) is None
+            or run_events.is_active(run_id)
+            or run_events.finished_events(run_id) is not None
+        )
+        if not tracked:
+            # Finished before its events could be retained, on another instance, or lost
+            yield format_sse((None, "status", {"status": final_status(run.status)}))
+            return
+
+        async for event in run_events.subscribe(run_id, after=last_event_id or 0, timeout=SSE_HEARTBEAT_INTERVAL):
+            if event is not None:
+                yield format_sse(event)
+                continue
+
+            # Idle: keep the connection open and catch runs finished without events here
+            yield ": keep-alive\n\n"
+            status = final_status(await run_status())
+            if status is not None and not run_events.is_active(run_id):
+                yield format_sse((None, "status", {"status": status}))
+                return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.delete("/runs/{run_id}")
 async def delete_run(
     run_id: str,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Delete a run and all its documents."""
-    run = db.query(RunModel).join(SubredditModel).filter(
+    """Delete a run and the documents no other run links to."""
+    result = await db.execute(select(RunModel).where(
         RunModel.id == run_id,
-        SubredditModel.owner_id == current_user.id
-    ).first()
+        RunModel.owner_id == current_user.id
+    ))
+    run = result.scalars().first()
 
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
 
     run_name = run.name
-    db.delete(run)
-    db.commit()
+    await delete_runs(db, [run.id])
+    await db.commit()
 
     logger.info(f"Deleted run: {run_name} by user: {current_user.username}")
     return {"message": f"Run {run_name} deleted successfully"}
 
+# Archive endpoints
+@app.get("/archives/", response_model=List[RunArchiveResponse])
+async def get_archives(
+    subreddit_id: Optional[str] = None,
+    current_user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the current user's runs archived by retention policies, optionally of one subreddit."""
+    query = select(RunArchiveModel).where(RunArchiveModel.owner_id == current_user.id)
+    if subreddit_id is not None:
+        query = query.where(RunArchiveModel.subreddit_id == subreddit_id)
+    archives = (await db.scalars(query.order_by(RunArchiveModel.run_created_at.desc()))).all()
+    return [RunArchiveResponse.from_orm(archive) for archive in archives]
+
+@app.post("/archives/{run_id}/restore", response_model=RunResponse)
+async def restore_archived_run(
+    run_id: str,
+    current_user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Restore an archived run with its documents and comments."""
+    result = await db.execute(select(RunArchiveModel).where(
+        RunArchiveModel.run_id == run_id,
+        RunArchiveModel.owner_id == current_user.id
+    ))
+    archive = result.scalars().first()
+
+    if not archive:
+        raise HTTPException(status_code=404, detail="Archive not found")
+
+    try:
+        run = await restore_run(db, archive)
+    except RunExistsError:
+        raise HTTPException(status_code=409, detail="Run already exists")
+    except FileNotFoundError:
+        logger.error(f"Archive file {archive.path} of run {run_id} is missing")
+        raise HTTPException(status_code=410, detail="Archive file is missing")
+
+    logger.info(f"Restored run: {run.name} by user: {current_user.username}")
+    return RunResponse.from_orm(run)
+
 # Document endpoints
-@app.get("/documents/", response_model=List[DocumentResponse])
+@app.get("/documents/", response_model=DocumentPage, responses=NDJSON_RESPONSES)
 async def get_documents(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all documents for the current user."""
-    documents = db.query(DocumentModel).join(RunModel).join(SubredditModel).filter(
-        SubredditModel.owner_id == current_user.id
-    ).all()
-    return [DocumentResponse.from_orm(doc) for doc in documents]
+    """Get a page of documents for the current user, or stream them all as NDJSON."""
+    query = select(DocumentModel).where(
+        DocumentModel.owner_id == current_user.id
+    )
+    if wants_ndjson(request):
+        return stream_ndjson(query, DocumentModel, DocumentResponse, cursor)
+
+    documents, next_cursor = await paginate(db, query, DocumentModel, cursor, limit)
+    return DocumentPage(items=[DocumentResponse.from_orm(doc) for doc in documents], next_cursor=next_cursor)
+
+@app.get("/documents/search", response_model=List[DocumentSearchResult], dependencies=[Depends(rate_limit("search"))])
+async def search_documents_endpoint(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Full-text search of the current user's documents, best matches first."""
+    results = await search_documents(db, current_user.id, q, limit, offset)
+    return [DocumentSearchResult.from_orm(result) for result in results]
 
 @app.get("/documents/{document_id}", response_model=DocumentWithCommentsResponse)
 async def get_document(
     document_id: str,
+    request: Request,
+    response: Response,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific document with its comments."""
-    document = db.query(DocumentModel).join(RunModel).join(SubredditModel).filter(
+    etag = await resource_etag(db, DocumentModel, document_id, current_user.id, CommentModel.document_id, CommentModel.created_at)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    result = await db.execute(select(DocumentModel).options(selectinload(DocumentModel.comments)).where(
         DocumentModel.id == document_id,
-        SubredditModel.owner_id == current_user.id
-    ).first()
+        DocumentModel.owner_id == current_user.id
+    ))
+    document = result.scalars().first()
 
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    set_cache_headers(response, etag)
     return DocumentWithCommentsResponse.from_orm(document)
 
 @app.delete("/documents/{document_id}")
 async def delete_document(
     document_id: str,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a document."""
-    document = db.query(DocumentModel).join(RunModel).join(SubredditModel).filter(
+    result = await db.execute(select(DocumentModel).where(
         DocumentModel.id == document_id,
-        SubredditModel.owner_id == current_user.id
-    ).first()
+        DocumentModel.owner_id == current_user.id
+    ))
+    document = result.scalars().first()
 
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    db.delete(document)
-    db.commit()
+    await db.delete(document)
+    await db.commit()
 
     logger.info(f"Deleted document: {document_id} by user: {current_user.username}")
     return {"message": f"Document {document_id} deleted successfully"}
@@ -400,14 +789,15 @@ async def delete_document(
 async def add_comment(
     comment: AIGeneratedComment,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Add a new AI-generated comment."""
     # Verify the document belongs to the current user
-    document = db.query(DocumentModel).join(RunModel).join(SubredditModel).filter(
+    result = await db.execute(select(DocumentModel).where(
         DocumentModel.id == comment.document_id,
-        SubredditModel.owner_id == current_user.id
-    ).first()
+        DocumentModel.owner_id == current_user.id
+    ))
+    document = result.scalars().first()
 
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -418,38 +808,88 @@ async def add_comment(
         content=comment.content,
         tone=comment.tone,
         document_id=comment.document_id,
+        owner_id=current_user.id,
         comment_metadata=comment.metadata
     )
 
     db.add(new_comment)
-    db.commit()
-    db.refresh(new_comment)
+    await db.commit()
+    await db.refresh(new_comment)
 
     logger.info(f"Added comment for document: {comment.document_id} by user: {current_user.username}")
     return CommentResponse.from_orm(new_comment)
 
-@app.get("/comments/", response_model=List[CommentResponse])
+@app.post("/comments/batch", response_model=CommentBatchResponse, dependencies=[Depends(rate_limit("comments_batch"))])
+async def add_comments(
+    batch: AIGeneratedCommentBatch,
+    current_user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Add many AI-generated comments in one transaction, reporting errors per comment."""
+    # Verify all referenced documents belong to the current user in one query
+    document_ids = {comment.document_id for comment in batch.comments}
+    result = await db.execute(select(DocumentModel.id).where(
+        DocumentModel.id.in_(document_ids),
+        DocumentModel.owner_id == current_user.id
+    ))
+    owned_document_ids = set(result.scalars().all())
+
+    new_comments = []
+    errors = []
+    for index, comment in enumerate(batch.comments):
+        if comment.document_id not in owned_document_ids:
+            errors.append(CommentBatchError(index=index, document_id=comment.document_id, detail="Document not found"))
+            continue
+
+        new_comments.append(CommentModel(
+            id=str(uuid.uuid4()),
+            content=comment.content,
+            tone=comment.tone,
+            document_id=comment.document_id,
+            owner_id=current_user.id,
+            comment_metadata=comment.metadata
+        ))
+
+    if new_comments:
+        db.add_all(new_comments)
+        await db.commit()
+
+    logger.info(f"Added {len(new_comments)} comments ({len(errors)} rejected) by user: {current_user.username}")
+    return CommentBatchResponse(
+        created=[CommentResponse.from_orm(comment) for comment in new_comments],
+        errors=errors
+    )
+
+@app.get("/comments/", response_model=CommentPage, responses=NDJSON_RESPONSES)
 async def get_comments(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all AI-generated comments for the current user."""
-    comments = db.query(CommentModel).join(DocumentModel).join(RunModel).join(SubredditModel).filter(
-        SubredditModel.owner_id == current_user.id
-    ).all()
-    return [CommentResponse.from_orm(comment) for comment in comments]
+    """Get a page of AI-generated comments for the current user, or stream them all as NDJSON."""
+    query = select(CommentModel).where(
+        CommentModel.owner_id == current_user.id
+    )
+    if wants_ndjson(request):
+        return stream_ndjson(query, CommentModel, CommentResponse, cursor)
+
+    comments, next_cursor = await paginate(db, query, CommentModel, cursor, limit)
+    return CommentPage(items=[CommentResponse.from_orm(comment) for comment in comments], next_cursor=next_cursor)
 
 @app.get("/comments/{comment_id}", response_model=CommentResponse)
 async def get_comment(
     comment_id: str,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific AI-generated comment."""
-    comment = db.query(CommentModel).join(DocumentModel).join(RunModel).join(SubredditModel).filter(
+    result = await db.execute(select(CommentModel).where(
         CommentModel.id == comment_id,
-        SubredditModel.owner_id == current_user.id
-    ).first()
+        CommentModel.owner_id == current_user.id
+    ))
+    comment = result.scalars().first()
 
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
@@ -460,58 +900,79 @@ async def get_comment(
 async def get_document_comments(
     document_id: str,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all comments for a specific document."""
     # Verify the document belongs to the current user
-    document = db.query(DocumentModel).join(RunModel).join(SubredditModel).filter(
+    result = await db.execute(select(DocumentModel).where(
         DocumentModel.id == document_id,
-        SubredditModel.owner_id == current_user.id
-    ).first()
+        DocumentModel.owner_id == current_user.id
+    ))
+    document = result.scalars().first()
 
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    comments = db.query(CommentModel).filter(CommentModel.document_id == document_id).all()
+    result = await db.execute(select(CommentModel).where(CommentModel.document_id == document_id))
+    comments = result.scalars().all()
     return [CommentResponse.from_orm(comment) for comment in comments]
 
 @app.delete("/comments/{comment_id}")
 async def delete_comment(
     comment_id: str,
     current_user: UserModel = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete an AI-generated comment."""
-    comment = db.query(CommentModel).join(DocumentModel).join(RunModel).join(SubredditModel).filter(
+    result = await db.execute(select(CommentModel).where(
         CommentModel.id == comment_id,
-        SubredditModel.owner_id == current_user.id
-    ).first()
+        CommentModel.owner_id == current_user.id
+    ))
+    comment = result.scalars().first()
 
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
 
-    db.delete(comment)
-    db.commit()
+    await db.delete(comment)
+    await db.commit()
 
     logger.info(f"Deleted comment: {comment_id} by user: {current_user.username}")
     return {"message": f"Comment {comment_id} deleted successfully"}
 
-# Health check endpoint
-@app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    """Health check endpoint."""
-    subreddits_count = db.query(SubredditModel).count()
-    documents_count = db.query(DocumentModel).count()
-    comments_count = db.query(CommentModel).count()
+# Health check endpoints
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
 
+@app.get("/health/ready")
+async def readiness_check(db: AsyncSession = Depends(get_db)):
+    """Readiness probe: the database is reachable."""
+    try:
+        await db.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error(f"Readiness check failed: {e}")
+        raise HTTPException(status_code=503, detail="Database unavailable")
+
+    return {"status": "ready"}
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint with entity counts from the periodic stats snapshot."""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "subreddits_count": subreddits_count,
-        "documents_count": documents_count,
-        "comments_count": comments_count
+        **stats_snapshot.counts,
+        "stats_updated_at": stats_snapshot.updated_at.isoformat() if stats_snapshot.updated_at else None,
+        "auth_cache": auth_cache_stats()
     }
 
+# Metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request, database, pipeline and LLM metrics of this process in the Prometheus text format."""
+    return metrics_response()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
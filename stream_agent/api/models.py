@@ -1,10 +1,21 @@
-from sqlalchemy import Column, String, Integer, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, String, Integer, Float, Text, DateTime, Boolean, ForeignKey, JSON, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
 from .database import Base
 
+# JSON on SQLite, JSONB on Postgres, where it can be indexed and compared
+MetadataJSON = JSON().with_variant(JSONB(), "postgresql")
+
+# GIN indexes (jsonb_path_ops) serving `@>` containment queries on metadata, created on Postgres
+# only by migration 0010 since SQLite has no equivalent; name -> (table, column)
+POSTGRES_METADATA_INDEXES = {
+    "ix_documents_doc_metadata": ("documents", "doc_metadata"),
+    "ix_ai_generated_comments_comment_metadata": ("ai_generated_comments", "comment_metadata"),
+}
+
 
 class User(Base):
     __tablename__ = "users"
@@ -30,12 +41,21 @@ class Subreddit(Base):
     target_number = Column(Integer, nullable=False)
     audience_specification = Column(Text, nullable=False)
     subreddit_description = Column(Text, nullable=False)
-    owner_id = Column(String, ForeignKey("users.id"), nullable=False)
+    incremental = Column(Boolean, default=False, nullable=False)  # Reuse the ranking of posts seen by earlier runs
+    active = Column(Boolean, default=True, nullable=False)
+    schedule_minutes = Column(Integer, nullable=True)  # Minutes between scheduled runs, None if not scheduled
+    next_run_at = Column(DateTime, nullable=True, index=True)  # When the next scheduled run is due
+    retention_days = Column(Integer, nullable=True)  # Runs older than this are archived, None to keep them
+    retention_runs = Column(Integer, nullable=True)  # Runs beyond the newest this many are archived, None to keep them
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     owner = relationship("User", back_populates="subreddits")
     runs = relationship("Run", back_populates="subreddit", cascade="all, delete-orphan")
+    seen_posts = relationship("SeenPost", back_populates="subreddit", cascade="all, delete-orphan")
+    archives = relationship("RunArchive", back_populates="subreddit", cascade="all, delete-orphan")
 
 
 class Run(Base):
@@ -43,13 +63,28 @@ class Run(Base):
 
     id = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)  # Date-based name
-    subreddit_id = Column(String, ForeignKey("subreddits.id"), nullable=False)
+    subreddit_id = Column(String, ForeignKey("subreddits.id"), nullable=False, index=True)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False)  # Denormalized from subreddit
     created_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String, default="completed")  # completed, failed, in_progress
+    batch_id = Column(String, nullable=True, index=True)  # Set for runs started together by process-all
+    restored_at = Column(DateTime, nullable=True)  # When the run was last restored from an archive
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_runs_owner_id_created_at", "owner_id", "created_at", "id"),
+        # At most one run in progress per subreddit, enforced by the database
+        Index(
+            "ix_runs_subreddit_id_in_progress", "subreddit_id", unique=True,
+            sqlite_where=text("status = 'in_progress'"), postgresql_where=text("status = 'in_progress'"),
+        ),
+    )
 
     # Relationships
     subreddit = relationship("Subreddit", back_populates="runs")
-    documents = relationship("Document", back_populates="run", cascade="all, delete-orphan")
+    document_links = relationship(
+        "RunDocument", back_populates="run", cascade="all, delete-orphan", order_by="RunDocument.rank"
+    )
 
 
 class Document(Base):
@@ -59,24 +94,94 @@ class Document(Base):
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
     url = Column(String, nullable=True)
+    content_hash = Column(String, nullable=False)  # Hash of the URL, or of the text when there is none
     created_at = Column(DateTime, default=datetime.utcnow)
-    doc_metadata = Column(JSON, nullable=True)
-    run_id = Column(String, ForeignKey("runs.id"), nullable=False)
+    doc_metadata = Column(MetadataJSON, nullable=True)  # As of the latest run
+    run_id = Column(String, ForeignKey("runs.id"), nullable=False, index=True)  # Latest run that linked it
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False)  # Denormalized from run
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_documents_owner_id_created_at", "owner_id", "created_at", "id"),
+        Index("ix_documents_owner_id_content_hash", "owner_id", "content_hash", unique=True),
+    )
 
     # Relationships
-    run = relationship("Run", back_populates="documents")
+    run = relationship("Run")
+    run_links = relationship("RunDocument", back_populates="document", cascade="all, delete-orphan")
     comments = relationship("AIGeneratedComment", back_populates="document", cascade="all, delete-orphan")
 
 
+# A document as returned by one run, with its rank and the metadata seen by that run
+class RunDocument(Base):
+    __tablename__ = "run_documents"
+
+    run_id = Column(String, ForeignKey("runs.id"), primary_key=True)
+    document_id = Column(String, ForeignKey("documents.id"), primary_key=True, index=True)
+    rank = Column(Integer, nullable=False)  # Position in the run's results, from 0
+    doc_metadata = Column(MetadataJSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    run = relationship("Run", back_populates="document_links")
+    document = relationship("Document", back_populates="run_links")
+
+
+# A post ranked by a run of an incremental subreddit, so later runs can reuse its ranking
+class SeenPost(Base):
+    __tablename__ = "seen_posts"
+
+    subreddit_id = Column(String, ForeignKey("subreddits.id"), primary_key=True)
+    post_id = Column(String, primary_key=True)  # Reddit post id
+    content_hash = Column(String, nullable=False)  # Of the document saved for the post
+    category = Column(String, nullable=False)
+    rank = Column(Integer, nullable=False)  # From 1
+    ranked_with = Column(Integer, nullable=False)  # Number of documents in the run that ranked it
+    created_utc = Column(Float, nullable=False)  # When the post was created on Reddit
+    seen_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_seen_posts_subreddit_id_created_utc", "subreddit_id", "created_utc"),
+    )
+
+    # Relationships
+    subreddit = relationship("Subreddit", back_populates="seen_posts")
+
+
+# A run moved out of the database into a compressed archive file by the retention policy
+class RunArchive(Base):
+    __tablename__ = "run_archives"
+
+    run_id = Column(String, primary_key=True)  # Id of the archived run, reused when it is restored
+    subreddit_id = Column(String, ForeignKey("subreddits.id"), nullable=False, index=True)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    run_created_at = Column(DateTime, nullable=False)
+    documents_count = Column(Integer, nullable=False)
+    comments_count = Column(Integer, nullable=False)
+    path = Column(String, nullable=False)  # Relative to ARCHIVE_DIR
+    size_bytes = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    subreddit = relationship("Subreddit", back_populates="archives")
+
+
 class AIGeneratedComment(Base):
     __tablename__ = "ai_generated_comments"
 
     id = Column(String, primary_key=True, index=True)
     content = Column(Text, nullable=False)
     tone = Column(String, nullable=False)
-    document_id = Column(String, ForeignKey("documents.id"), nullable=False)
-    comment_metadata = Column(JSON, nullable=True)
+    document_id = Column(String, ForeignKey("documents.id"), nullable=False, index=True)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False)  # Denormalized from document
+    comment_metadata = Column(MetadataJSON, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_ai_generated_comments_owner_id_created_at", "owner_id", "created_at", "id"),
+    )
+
     # Relationships
     document = relationship("Document", back_populates="comments")
\ No newline at end of file
@@ -0,0 +1,94 @@
+import base64
+import binascii
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import and_, or_, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from stream_agent.api.database import AsyncSessionLocal
+
+# Pagination configuration
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# OpenAPI description of the NDJSON alternative for list endpoints
+NDJSON_RESPONSES = {200: {"content": {NDJSON_MEDIA_TYPE: {}}}}
+
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    """Encode a (created_at, id) position as an opaque cursor."""
+    raw = json.dumps([created_at.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Whether the client asked for a streamed NDJSON response."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def keyset_query(stmt: Select, model: Any, cursor: Optional[str]) -> Select:
+    """Order a query by (created_at, id) and start it after the cursor position."""
+    if cursor is not None:
+        created_at, id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            model.created_at > created_at,
+            and_(model.created_at == created_at, model.id > id)
+        ))
+    return stmt.order_by(model.created_at, model.id)
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    model: Any,
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page of rows and the cursor of the next page, if any."""
+    result = await db.execute(keyset_query(stmt, model, cursor).limit(limit + 1))
+    rows = result.scalars().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows, next_cursor
+
+
+def stream_ndjson(
+    stmt: Select,
+    model: Any,
+    response_model: Type[BaseModel],
+    cursor: Optional[str]
+) -> StreamingResponse:
+    """Stream every row after the cursor as NDJSON from a server-side cursor."""
+    stmt = keyset_query(stmt, model, cursor).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    async def rows():
+        # The request's session is closed before the body is sent, so the stream owns its own
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(stmt)
+            async for partition in result.scalars().partitions():
+                yield "".join(response_model.from_orm(row).model_dump_json() + "\n" for row in partition)
+                db.expunge_all()
+
+    return StreamingResponse(rows(), media_type=NDJSON_MEDIA_TYPE)
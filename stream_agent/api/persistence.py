@@ -0,0 +1,302 @@
+import hashlib
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from sqlalchemy import and_, delete, exists, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from stream_agent.common.schemas import Document, ContentType, DocumentType
+from stream_agent.api.models import (
+    Subreddit as SubredditModel, Run as RunModel, Document as DocumentModel, RunDocument as RunDocumentModel,
+    SeenPost as SeenPostModel, AIGeneratedComment as CommentModel
+)
+from stream_agent.parser_agents.reddit.schemas import KnownPost
+from stream_agent.parser_agents.reddit.tools import TIME_RANGE_SECONDS
+
+# Inserts supporting ON CONFLICT, per dialect
+DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def new_run_name() -> str:
+    """Date-based name for a new run."""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def run_in_progress(subreddit_id):
+    """Condition that a subreddit (an id or a correlated column) has a run in progress, so a new one must wait.
+
+    Runs lost with a crashed process stop counting once the stale-run reaper fails them.
+    """
+    return exists().where(RunModel.subreddit_id == subreddit_id, RunModel.status == "in_progress")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a document URL: lowercase scheme and host, no fragment or trailing slash."""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), parts.query, ""))
+
+
+def document_hash(url: Optional[str], title: Optional[str], content: Optional[str]) -> str:
+    """Key of a document in its owner's store.
+
+    Posts are identified by their permalink, so a post returned again by a later
+    run maps to the stored document; documents without a URL fall back to their text.
+    """
+    if url:
+        key = "url:" + normalize_url(url)
+    else:
+        key = f"text:{title or ''}\0{content or ''}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def run_entries(documents: List[Document]) -> Dict[str, Dict[str, Any]]:
+    """The distinct documents of a run by hash, in rank order."""
+    entries: Dict[str, Dict[str, Any]] = {}
+    for doc in documents:
+        url = str(doc.url) if doc.url else None  # Convert HttpUrl to string
+        key = document_hash(url, doc.title, doc.content)
+        if key not in entries:
+            entries[key] = {
+                "rank": len(entries),
+                "title": doc.title,
+                "content": doc.content,
+                "url": url,
+                "doc_metadata": doc.metadata,
+            }
+    return entries
+
+
+async def _link_documents(db: AsyncSession, run_id: str, owner_id: str, documents: List[Document]) -> List[str]:
+    entries = run_entries(documents)
+    if not entries:
+        return []
+
+    # Documents the owner already has
+    result = await db.execute(
+        select(DocumentModel.id, DocumentModel.content_hash, DocumentModel.title, DocumentModel.content)
+        .where(DocumentModel.owner_id == owner_id, DocumentModel.content_hash.in_(entries))
+    )
+    existing = {row.content_hash: row for row in result}
+    document_ids = {key: row.id for key, row in existing.items()}
+
+    new_rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "title": entry["title"],
+            "content": entry["content"],
+            "url": entry["url"],
+            "content_hash": key,
+            "doc_metadata": entry["doc_metadata"],
+            "run_id": run_id,
+            "owner_id": owner_id,
+        }
+        for key, entry in entries.items()
+        if key not in existing
+    ]
+    if new_rows:
+        dialect_insert = DIALECT_INSERTS[db.get_bind().dialect.name]
+        await db.execute(
+            dialect_insert(DocumentModel).on_conflict_do_nothing(index_elements=["owner_id", "content_hash"]),
+            new_rows
+        )
+        # Read the ids back, since a concurrent run may have stored some of them first
+        result = await db.execute(
+            select(DocumentModel.id, DocumentModel.content_hash)
+            .where(DocumentModel.owner_id == owner_id, DocumentModel.content_hash.in_([row["content_hash"] for row in new_rows]))
+        )
+        document_ids.update({row.content_hash: row.id for row in result})
+
+    # Point documents seen before at this run, rewriting the text only of edited posts
+    refreshed, edited = [], []
+    for key, row in existing.items():
+        entry = entries[key]
+        params = {"id": row.id, "run_id": run_id, "doc_metadata": entry["doc_metadata"]}
+        if (row.title, row.content) != (entry["title"], entry["content"]):
+            edited.append({**params, "title": entry["title"], "content": entry["content"]})
+        else:
+            refreshed.append(params)
+    for params in (refreshed, edited):
+        if params:
+            await db.execute(update(DocumentModel), params)
+
+    # A single executemany for all links
+    await db.execute(insert(RunDocumentModel), [
+        {
+            "run_id": run_id,
+            "document_id": document_ids[key],
+            "rank": entry["rank"],
+            "doc_metadata": entry["doc_metadata"],
+        }
+        for key, entry in entries.items()
+    ])
+    return [document_ids[key] for key in entries]
+
+
+def listing_cutoff(time_range: str) -> Optional[float]:
+    """Creation time (UTC timestamp) of the oldest post a listing can return now, or None if unlimited."""
+    seconds = TIME_RANGE_SECONDS.get(time_range)
+    return time.time() - seconds if seconds is not None else None
+
+
+async def load_known_posts(db: AsyncSession, run_id: str) -> Optional[Dict[str, KnownPost]]:
+    """Posts ranked by earlier runs of the run's subreddit by post id, or None if it is not incremental."""
+    result = await db.execute(
+        select(SubredditModel).join(RunModel, RunModel.subreddit_id == SubredditModel.id).where(RunModel.id == run_id)
+    )
+    subreddit = result.scalars().first()
+    if subreddit is None or not subreddit.incremental:
+        return None
+
+    # Posts whose document was deleted since are ranked again
+    query = (
+        select(SeenPostModel, DocumentModel)
+        .join(DocumentModel, and_(
+            DocumentModel.owner_id == subreddit.owner_id,
+            DocumentModel.content_hash == SeenPostModel.content_hash
+        ))
+        .where(SeenPostModel.subreddit_id == subreddit.id)
+    )
+    cutoff = listing_cutoff(subreddit.time_range)
+    if cutoff is not None:
+        query = query.where(SeenPostModel.created_utc >= cutoff)
+
+    result = await db.execute(query)
+    return {
+        seen.post_id: KnownPost(
+            document=Document(
+                url=document.url,
+                type=ContentType.REDDIT,
+                category=seen.category,
+                file_type=DocumentType.MARKDOWN,
+                title=document.title,
+                date_published=datetime.fromtimestamp(seen.created_utc),
+                content=document.content,
+                metadata=document.doc_metadata or {}
+            ),
+            rank=seen.rank,
+            ranked_with=seen.ranked_with
+        )
+        for seen, document in result
+    }
+
+
+async def record_seen_posts(db: AsyncSession, subreddit: SubredditModel, documents: List[Document]):
+    """Remember the ranking of a run's posts for later runs of an incremental subreddit, without committing.
+
+    Posts too old to be listed again are forgotten.
+    """
+    rows = [
+        {
+            "subreddit_id": subreddit.id,
+            "post_id": doc.metadata["post_id"],
+            "content_hash": document_hash(str(doc.url) if doc.url else None, doc.title, doc.content),
+            "category": doc.category.value,
+            "rank": rank,
+            "ranked_with": len(documents),
+            "created_utc": doc.date_published.timestamp(),
+            "seen_at": datetime.utcnow(),
+        }
+        for rank, doc in enumerate(documents, start=1)
+        if "post_id" in doc.metadata and doc.date_published is not None
+    ]
+    if rows:
+        upsert = DIALECT_INSERTS[db.get_bind().dialect.name](SeenPostModel)
+        await db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=["subreddit_id", "post_id"],
+                set_={column: upsert.excluded[column] for column in ("content_hash", "category", "rank", "ranked_with", "seen_at")}
+            ),
+            rows
+        )
+
+    cutoff = listing_cutoff(subreddit.time_range)
+    if cutoff is not None:
+        await db.execute(
+            delete(SeenPostModel).where(SeenPostModel.subreddit_id == subreddit.id, SeenPostModel.created_utc < cutoff),
+            execution_options={"synchronize_session": False}
+        )
+
+
+async def complete_run(db: AsyncSession, run_id: str, documents: List[Document]) -> Optional[List[str]]:
+    """Save the documents of an in-progress run and mark it completed in one transaction.
+
+    Returns the ids of the run's documents, or None if the run no longer exists.
+    """
+    try:
+        run = await db.get(RunModel, run_id)
+        if run is None:
+            return None
+
+        run.status = "completed"
+        document_ids = await _link_documents(db, run_id, run.owner_id, documents)
+        subreddit = await db.get(SubredditModel, run.subreddit_id)
+        if subreddit is not None and subreddit.incremental:
+            await record_seen_posts(db, subreddit, documents)
+        await db.commit()
+        return document_ids
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def persist_run(
+    db: AsyncSession,
+    subreddit_id: str,
+    documents: List[Document],
+    name: Optional[str] = None
+) -> str:
+    """Create a completed run with all its documents in one transaction and return its id."""
+    run_id = str(uuid.uuid4())
+    try:
+        owner_id = await db.scalar(select(SubredditModel.owner_id).where(SubredditModel.id == subreddit_id))
+        if owner_id is None:
+            raise ValueError(f"Subreddit {subreddit_id} not found")
+
+        await db.execute(insert(RunModel).values(
+            id=run_id,
+            name=name or new_run_name(),
+            subreddit_id=subreddit_id,
+            owner_id=owner_id,
+            status="completed"
+        ))
+        await _link_documents(db, run_id, owner_id, documents)
+        await db.commit()
+        return run_id
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def delete_runs(db: AsyncSession, run_ids: List[str]):
+    """Delete runs along with the documents no other run links to, without committing.
+
+    Documents still linked by another run are kept and point at the latest of them.
+    """
+    # Bulk statements; the session's objects are not refreshed
+    bulk = {"synchronize_session": False}
+    await db.execute(delete(RunDocumentModel).where(RunDocumentModel.run_id.in_(run_ids)), execution_options=bulk)
+
+    # A document's run is always one of the runs linking it, so only these can be left unlinked
+    orphaned = (DocumentModel.run_id.in_(run_ids), ~exists().where(RunDocumentModel.document_id == DocumentModel.id))
+    await db.execute(
+        delete(CommentModel).where(CommentModel.document_id.in_(select(DocumentModel.id).where(*orphaned))),
+        execution_options=bulk
+    )
+    await db.execute(delete(DocumentModel).where(*orphaned), execution_options=bulk)
+
+    latest_run_id = (
+        select(RunDocumentModel.run_id)
+        .where(RunDocumentModel.document_id == DocumentModel.id)
+        .order_by(RunDocumentModel.created_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(DocumentModel).where(DocumentModel.run_id.in_(run_ids)).values(run_id=latest_run_id),
+        execution_options=bulk
+    )
+    await db.execute(delete(RunModel).where(RunModel.id.in_(run_ids)), execution_options=bulk)
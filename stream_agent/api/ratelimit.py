@@ -0,0 +1,186 @@
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from fastapi import Depends, HTTPException
+
+from stream_agent.api.auth import get_current_user
+from stream_agent.api.models import User as UserModel
+from stream_agent.common.limits import Rate
+
+logger = logging.getLogger(__name__)
+
+# Token bucket of each user on each limited route, as "<requests>/<period>" (e.g. "20/hour");
+# a user can spend the whole bucket at once and it refills evenly over the period. Empty or 0 disables
+RATE_LIMITS = {
+    "process": os.getenv("RATE_LIMIT_PROCESS", "30/hour"),
+    "search": os.getenv("RATE_LIMIT_SEARCH", "120/minute"),
+    "comments_batch": os.getenv("RATE_LIMIT_COMMENTS_BATCH", "60/minute"),
+}
+# Where buckets are kept: "memory" for this process only, or a redis:// URL shared by every instance
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Buckets kept by the in-memory backend; the least recently used are dropped first
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+
+class RateLimitBackend:
+    """Storage of token buckets.
+
+    `take` must refill and spend a bucket atomically, so that concurrent
+    requests sharing a backend never spend the same tokens twice.
+    """
+
+    async def take(self, key: str, rate: Rate, cost: float = 1) -> float:
+        """Spend `cost` tokens of a bucket if it has them.
+
+        Returns 0 when they were spent, otherwise the seconds until the
+        bucket will hold them; nothing is spent in that case.
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Buckets kept in this process, for a single instance or as a stand-in for a shared backend."""
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def take(self, key: str, rate: Rate, cost: float = 1) -> float:
+        # Nothing is awaited, so the bucket cannot change under us
+        now = self.clock()
+        tokens, updated_at = self._buckets.get(key, (rate.capacity, now))
+        tokens = min(rate.capacity, tokens + (now - updated_at) * rate.refill_per_second)
+
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate.refill_per_second
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            # A dropped bucket starts over full, so prefer idle users
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Refills and spends a bucket stored as a hash in one step, on the server's clock
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill)
+
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / refill
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+-- Drop the bucket once it would be full again
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / refill * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets kept in Redis and shared by every instance using the same server."""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError("A redis:// RATE_LIMIT_BACKEND needs the redis extra: pip install -e \".[redis]\"") from e
+
+        self.client = redis.from_url(url)
+        self._take = self.client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, rate: Rate, cost: float = 1) -> float:
+        wait = await self._take(keys=[key], args=[rate.capacity, rate.refill_per_second, cost])
+        return float(wait)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_backend(url: str) -> RateLimitBackend:
+    """Create the backend configured by RATE_LIMIT_BACKEND."""
+    if url == "memory":
+        return InMemoryRateLimitBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitBackend(url)
+    raise ValueError(f"Unsupported RATE_LIMIT_BACKEND {url!r}, expected 'memory' or a redis:// URL")
+
+
+class RateLimiter:
+    """Token-bucket limits per user and route.
+
+    The backend can be swapped at any time, e.g. for an in-memory one in tests.
+    If it fails, requests are let through rather than failing with it.
+    """
+
+    def __init__(self, backend: RateLimitBackend, rates: Dict[str, Optional[Rate]]):
+        self.backend = backend
+        self.rates = rates
+
+    async def hit(self, route: str, user_id: str, cost: float = 1):
+        """Spend `cost` tokens of the user's bucket for route, or raise 429 with a Retry-After."""
+        rate = self.rates.get(route)
+        if rate is None:
+            return
+
+        # Requests costing more than a full bucket need the bucket full rather than never passing
+        cost = min(cost, rate.capacity)
+        try:
+            wait = await self.backend.take(f"ratelimit:{route}:{user_id}", rate, cost)
+        except Exception as e:
+            logger.error(f"Rate limit backend failed, allowing request: {e}")
+            return
+
+        if wait > 0:
+            logger.info(f"Rate limited user {user_id} on {route} for {wait:.1f}s")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+
+    async def close(self):
+        await self.backend.close()
+
+
+rate_limiter = RateLimiter(
+    create_backend(RATE_LIMIT_BACKEND),
+    {route: Rate.parse(spec) for route, spec in RATE_LIMITS.items()}
+)
+
+
+def rate_limit(route: str):
+    """Dependency spending one token of the current user's bucket for route.
+
+    Usage:
+        @app.get("/documents/search", dependencies=[Depends(rate_limit("search"))])
+    """
+    async def dependency(current_user: UserModel = Depends(get_current_user)):
+        await rate_limiter.hit(route, current_user.id)
+    return dependency
@@ -14,6 +14,12 @@ class SubredditResponse(BaseModel):
     target_number: int
     audience_specification: str
     subreddit_description: str
+    incremental: bool = False
+    active: bool = True
+    schedule_minutes: Optional[int] = None
+    next_run_at: Optional[datetime] = None
+    retention_days: Optional[int] = None
+    retention_runs: Optional[int] = None
     owner_id: str
     created_at: datetime
 
@@ -27,6 +33,8 @@ class RunResponse(BaseModel):
     subreddit_id: str
     created_at: datetime
     status: str
+    batch_id: Optional[str] = None
+    restored_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -45,6 +53,19 @@ class DocumentResponse(BaseModel):
         from_attributes = True
 
 
+
+class DocumentSearchResult(BaseModel):
+    id: str
+    title: str
+    url: Optional[str] = None
+    run_id: str
+    created_at: datetime
+    snippet: str  # Matched terms wrapped in <mark></mark>
+    score: float  # Higher is more relevant
+
+    class Config:
+        from_attributes = True
+
 class CommentResponse(BaseModel):
     id: str
     content: str
@@ -57,11 +78,40 @@ class CommentResponse(BaseModel):
         from_attributes = True
 
 
+
+class CommentBatchError(BaseModel):
+    index: int
+    document_id: str
+    detail: str
+
+
+class CommentBatchResponse(BaseModel):
+    created: List[CommentResponse]
+    errors: List[CommentBatchError]
+
 class ProcessSubredditResponse(BaseModel):
     subreddit: str
     run_id: str
-    documents_count: int
-    document_ids: List[str]
+    status: str
+
+
+class ProcessBatchError(BaseModel):
+    subreddit_id: str
+    subreddit: str
+    detail: str
+
+
+class ProcessBatchResponse(BaseModel):
+    batch_id: str
+    runs: List[ProcessSubredditResponse]
+    errors: List[ProcessBatchError] = []
+
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    status: str  # in_progress until every run has finished, then completed or failed
+    counts: Dict[str, int]
+    runs: List[RunResponse]
 
 
 class UserResponse(BaseModel):
@@ -83,6 +133,12 @@ class SubredditWithRunsResponse(BaseModel):
     target_number: int
     audience_specification: str
     subreddit_description: str
+    incremental: bool = False
+    active: bool = True
+    schedule_minutes: Optional[int] = None
+    next_run_at: Optional[datetime] = None
+    retention_days: Optional[int] = None
+    retention_runs: Optional[int] = None
     owner_id: str
     created_at: datetime
     runs: List[RunResponse]
@@ -91,13 +147,17 @@ class SubredditWithRunsResponse(BaseModel):
         from_attributes = True
 
 
+class RunDocumentResponse(DocumentResponse):
+    rank: int  # Position in the run's results, from 0
+
+
 class RunWithDocumentsResponse(BaseModel):
     id: str
     name: str
     subreddit_id: str
     created_at: datetime
     status: str
-    documents: List[DocumentResponse]
+    documents: List[RunDocumentResponse]
 
     class Config:
         from_attributes = True
@@ -114,4 +174,33 @@ class DocumentWithCommentsResponse(BaseModel):
     comments: List[CommentResponse]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class RunArchiveResponse(BaseModel):
+    run_id: str
+    subreddit_id: str
+    name: str
+    status: str
+    run_created_at: datetime
+    documents_count: int
+    comments_count: int
+    size_bytes: int
+    archived_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class RunPage(BaseModel):
+    items: List[RunResponse]
+    next_cursor: Optional[str] = None
+
+
+class DocumentPage(BaseModel):
+    items: List[DocumentResponse]
+    next_cursor: Optional[str] = None
+
+
+class CommentPage(BaseModel):
+    items: List[CommentResponse]
+    next_cursor: Optional[str] = None
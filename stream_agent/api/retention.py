@@ -0,0 +1,401 @@
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import orjson
+import zstandard
+from sqlalchemy import delete, insert, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from stream_agent.api.database import AsyncSessionLocal, async_engine
+from stream_agent.api.models import (
+    Subreddit as SubredditModel, Run as RunModel, Document as DocumentModel, RunDocument as RunDocumentModel,
+    AIGeneratedComment as CommentModel, RunArchive as RunArchiveModel
+)
+from stream_agent.api.periodic import PeriodicTask
+from stream_agent.api.persistence import delete_runs
+
+logger = logging.getLogger(__name__)
+
+# Sweep for expired runs from this process; archiving deletes in batches, so concurrent sweeps are safe but redundant
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Directory holding one compressed JSONL file per archived run
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", "./archives"))
+# Seconds between sweeps for expired runs
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+# Runs archived and deleted per transaction, so a sweep never holds the write lock for long
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "50"))
+# Days a restored run is kept before the retention policy can archive it again
+RETENTION_RESTORE_GRACE_DAYS = float(os.getenv("RETENTION_RESTORE_GRACE_DAYS", "7"))
+# zstd level of archive files; they are written once and rarely read
+ARCHIVE_ZSTD_LEVEL = int(os.getenv("ARCHIVE_ZSTD_LEVEL", "10"))
+
+ARCHIVE_SUFFIX = ".jsonl.zst"
+
+
+class RunExistsError(Exception):
+    """Raised when restoring an archive whose run is in the database."""
+
+
+def archive_path(owner_id: str, run_id: str) -> Path:
+    """Path of a run's archive file, relative to ARCHIVE_DIR."""
+    return Path(owner_id) / f"{run_id}{ARCHIVE_SUFFIX}"
+
+
+def write_archive(path: Path, records: List[Dict[str, Any]]) -> int:
+    """Write records as zstd-compressed JSON lines and return the file size.
+
+    The file is written next to its final path and renamed into place, so a
+    crash never leaves a truncated archive behind.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".partial")
+    compressor = zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL)
+    with open(partial, "wb") as f, compressor.stream_writer(f) as writer:
+        for record in records:
+            writer.write(orjson.dumps(record) + b"\n")
+    partial.replace(path)
+    return path.stat().st_size
+
+
+def read_archive(path: Path) -> List[Dict[str, Any]]:
+    """Records of an archive file."""
+    with open(path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+        data = reader.read()
+    return [orjson.loads(line) for line in data.splitlines() if line]
+
+
+def delete_archive_files(paths: Iterable[str]):
+    """Remove archive files, relative to ARCHIVE_DIR, ignoring ones already gone."""
+    for path in paths:
+        (ARCHIVE_DIR / path).unlink(missing_ok=True)
+
+
+def _timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+async def expired_run_ids(db: AsyncSession, subreddit: SubredditModel, now: Optional[datetime] = None) -> List[str]:
+    """Ids of the subreddit's runs that its retention policy no longer keeps, oldest first.
+
+    A run expires once it is older than retention_days or is not among the
+    newest retention_runs finished runs. Runs in progress never expire, and
+    restored runs are kept for RETENTION_RESTORE_GRACE_DAYS after restoring.
+    """
+    now = now or datetime.utcnow()
+    finished = select(RunModel.id, RunModel.created_at, RunModel.restored_at).where(
+        RunModel.subreddit_id == subreddit.id,
+        RunModel.status != "in_progress"
+    )
+
+    expired = {}
+    if subreddit.retention_days is not None:
+        cutoff = now - timedelta(days=subreddit.retention_days)
+        for row in await db.execute(finished.where(RunModel.created_at < cutoff)):
+            expired[row.id] = row
+    if subreddit.retention_runs is not None:
+        # Everything after the newest retention_runs
+        rows = await db.execute(
+            finished.order_by(RunModel.created_at.desc(), RunModel.id.desc()).offset(subreddit.retention_runs)
+        )
+        for row in rows:
+            expired[row.id] = row
+
+    restored_after = now - timedelta(days=RETENTION_RESTORE_GRACE_DAYS)
+    return [
+        row.id
+        for row in sorted(expired.values(), key=lambda row: row.created_at)
+        if row.restored_at is None or row.restored_at < restored_after
+    ]
+
+
+async def archive_runs(db: AsyncSession, run_ids: List[str]) -> List[RunArchiveModel]:
+    """Write runs with their documents and comments to archive files and delete them, without committing.
+
+    Each file holds a "run" record followed by the run's "document" records,
+    in rank order, and the "comment" records of those documents. Documents
+    still linked by other runs stay in the database, so a file is complete
+    on its own and can be restored whatever happened to the rest.
+    """
+    if not run_ids:
+        return []
+
+    runs = (await db.scalars(select(RunModel).where(RunModel.id.in_(run_ids)))).all()
+    result = await db.execute(
+        select(
+            RunDocumentModel.run_id,
+            RunDocumentModel.rank,
+            RunDocumentModel.doc_metadata.label("link_metadata"),
+            RunDocumentModel.created_at.label("linked_at"),
+            DocumentModel.id, DocumentModel.title, DocumentModel.content, DocumentModel.url,
+            DocumentModel.content_hash, DocumentModel.doc_metadata, DocumentModel.created_at, DocumentModel.updated_at
+        )
+        .join(DocumentModel, DocumentModel.id == RunDocumentModel.document_id)
+        .where(RunDocumentModel.run_id.in_(run_ids))
+        .order_by(RunDocumentModel.run_id, RunDocumentModel.rank)
+    )
+    documents: Dict[str, List[Dict[str, Any]]] = {run.id: [] for run in runs}
+    for row in result.mappings():
+        documents[row["run_id"]].append({"type": "document", **row})
+
+    document_ids = {document["id"] for run_documents in documents.values() for document in run_documents}
+    comments: Dict[str, List[Dict[str, Any]]] = {}
+    if document_ids:
+        result = await db.execute(
+            select(
+                CommentModel.id, CommentModel.content, CommentModel.tone, CommentModel.document_id,
+                CommentModel.comment_metadata, CommentModel.created_at
+            )
+            .where(CommentModel.document_id.in_(document_ids))
+            .order_by(CommentModel.created_at)
+        )
+        for row in result.mappings():
+            comments.setdefault(row["document_id"], []).append({"type": "comment", **row})
+
+    archives = []
+    for run in runs:
+        run_comments = [comment for document in documents[run.id] for comment in comments.get(document["id"], [])]
+        records = [{
+            "type": "run",
+            "id": run.id,
+            "name": run.name,
+            "subreddit_id": run.subreddit_id,
+            "owner_id": run.owner_id,
+            "status": run.status,
+            "batch_id": run.batch_id,
+            "created_at": run.created_at,
+            "updated_at": run.updated_at,
+        }, *documents[run.id], *run_comments]
+
+        path = archive_path(run.owner_id, run.id)
+        # Compression is CPU-bound; keep it off the event loop
+        size = await asyncio.to_thread(write_archive, ARCHIVE_DIR / path, records)
+        archives.append(RunArchiveModel(
+            run_id=run.id,
+            subreddit_id=run.subreddit_id,
+            owner_id=run.owner_id,
+            name=run.name,
+            status=run.status,
+            run_created_at=run.created_at,
+            documents_count=len(documents[run.id]),
+            comments_count=len(run_comments),
+            path=str(path),
+            size_bytes=size
+        ))
+
+    await delete_runs(db, [run.id for run in runs])
+    db.add_all(archives)
+    return archives
+
+
+async def restore_run(db: AsyncSession, archive: RunArchiveModel) -> RunModel:
+    """Put an archived run back in the database with its documents and comments, and drop its archive.
+
+    Documents the owner still has, by content hash, are linked rather than
+    copied, and comments still in the database are kept as they are. Raises
+    RunExistsError if the run is in the database, and FileNotFoundError if
+    its archive file is gone.
+    """
+    if await db.scalar(select(RunModel.id).where(RunModel.id == archive.run_id)):
+        raise RunExistsError(f"Run {archive.run_id} already exists")
+
+    records = await asyncio.to_thread(read_archive, ARCHIVE_DIR / archive.path)
+    run = next(record for record in records if record["type"] == "run")
+    documents = [record for record in records if record["type"] == "document"]
+    comments = [record for record in records if record["type"] == "comment"]
+
+    await db.execute(insert(RunModel), [{
+        "id": run["id"],
+        "name": run["name"],
+        "subreddit_id": run["subreddit_id"],
+        "owner_id": run["owner_id"],
+        "status": run["status"],
+        "batch_id": run["batch_id"],
+        "created_at": _timestamp(run["created_at"]),
+        "restored_at": datetime.utcnow(),
+    }])
+
+    # Documents kept because another run links them, or stored again by a later run
+    document_ids = {}
+    if documents:
+        result = await db.execute(
+            select(DocumentModel.id, DocumentModel.content_hash).where(
+                DocumentModel.owner_id == run["owner_id"],
+                or_(
+                    DocumentModel.content_hash.in_([document["content_hash"] for document in documents]),
+                    DocumentModel.id.in_([document["id"] for document in documents])
+                )
+            )
+        )
+        existing = result.all()
+        by_hash = {row.content_hash: row.id for row in existing}
+        by_id = {row.id for row in existing}
+        for document in documents:
+            if document["content_hash"] in by_hash:
+                document_ids[document["id"]] = by_hash[document["content_hash"]]
+            elif document["id"] in by_id:
+                document_ids[document["id"]] = document["id"]
+
+    new_documents = [document for document in documents if document["id"] not in document_ids]
+    if new_documents:
+        await db.execute(insert(DocumentModel), [
+            {
+                "id": document["id"],
+                "title": document["title"],
+                "content": document["content"],
+                "url": document["url"],
+                "content_hash": document["content_hash"],
+                "doc_metadata": document["doc_metadata"],
+                "run_id": run["id"],
+                "owner_id": run["owner_id"],
+                "created_at": _timestamp(document["created_at"]),
+                "updated_at": _timestamp(document["updated_at"]),
+            }
+            for document in new_documents
+        ])
+        document_ids.update({document["id"]: document["id"] for document in new_documents})
+
+    if documents:
+        await db.execute(insert(RunDocumentModel), [
+            {
+                "run_id": run["id"],
+                "document_id": document_ids[document["id"]],
+                "rank": document["rank"],
+                "doc_metadata": document["link_metadata"],
+                "created_at": _timestamp(document["linked_at"]),
+            }
+            for document in documents
+        ])
+
+    if comments:
+        kept = set((await db.scalars(
+            select(CommentModel.id).where(CommentModel.id.in_([comment["id"] for comment in comments]))
+        )).all())
+        missing = [comment for comment in comments if comment["id"] not in kept]
+        if missing:
+            await db.execute(insert(CommentModel), [
+                {
+                    "id": comment["id"],
+                    "content": comment["content"],
+                    "tone": comment["tone"],
+                    "document_id": document_ids[comment["document_id"]],
+                    "owner_id": run["owner_id"],
+                    "comment_metadata": comment["comment_metadata"],
+                    "created_at": _timestamp(comment["created_at"]),
+                }
+                for comment in missing
+            ])
+
+    await db.execute(
+        delete(RunArchiveModel).where(RunArchiveModel.run_id == archive.run_id),
+        execution_options={"synchronize_session": False}
+    )
+    await db.commit()
+    delete_archive_files([archive.path])
+
+    logger.info(f"Restored run {run['id']} with {len(documents)} documents and {len(comments)} comments")
+    return await db.get(RunModel, run["id"])
+
+
+async def compact(db: AsyncSession) -> int:
+    """Return the pages freed by deleted runs to the filesystem, and how many there were.
+
+    Only SQLite needs this: Postgres autovacuum makes the space of deleted
+    rows reusable on its own.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return 0
+
+    if await db.scalar(text("PRAGMA auto_vacuum")) != 2:
+        logger.warning("SQLite auto_vacuum is not INCREMENTAL; run the migrations to enable compaction")
+        return 0
+    free_pages = await db.scalar(text("PRAGMA freelist_count"))
+    await db.commit()
+    if free_pages:
+        # sqlite3 steps a statement returning no columns only once, which frees a single page;
+        # executescript runs it to completion
+        connection = await (await db.connection()).get_raw_connection()
+        await connection.driver_connection.executescript("PRAGMA incremental_vacuum")
+    return free_pages
+
+
+async def sweep(batch_size: int = RETENTION_BATCH_SIZE, now: Optional[datetime] = None) -> int:
+    """Archive the expired runs of every subreddit with a retention policy, then compact the database.
+
+    Returns the number of runs archived.
+    """
+    archived = 0
+    async with AsyncSessionLocal() as db:
+        subreddits = (await db.scalars(select(SubredditModel).where(or_(
+            SubredditModel.retention_days.is_not(None),
+            SubredditModel.retention_runs.is_not(None)
+        )))).all()
+
+        for subreddit in subreddits:
+            run_ids = await expired_run_ids(db, subreddit, now)
+            for start in range(0, len(run_ids), batch_size):
+                archives = await archive_runs(db, run_ids[start:start + batch_size])
+                await db.commit()
+                archived += len(archives)
+            if run_ids:
+                logger.info(f"Archived {len(run_ids)} expired runs of subreddit {subreddit.subreddit}")
+
+        if archived:
+            free_pages = await compact(db)
+            logger.info(f"Compacted the database, releasing {free_pages} free pages")
+    return archived
+
+
+class RetentionSweeper(PeriodicTask):
+    """Periodically archives the runs that subreddit retention policies no longer keep."""
+
+    name = "retention-sweeper"
+
+    def __init__(self, interval: float = RETENTION_INTERVAL):
+        super().__init__(interval)
+
+    async def run_once(self):
+        await sweep()
+
+
+retention_sweeper = RetentionSweeper()
+
+
+async def _main(args: argparse.Namespace):
+    try:
+        if args.command == "sweep":
+            archived = await sweep(args.batch_size)
+            print(f"Archived {archived} runs")
+        elif args.command == "list":
+            async with AsyncSessionLocal() as db:
+                archives = (await db.scalars(
+                    select(RunArchiveModel).order_by(RunArchiveModel.run_created_at)
+                )).all()
+            for archive in archives:
+                print(f"{archive.run_id}  {archive.name}  {archive.status:<10} {archive.documents_count:>5} documents "
+                      f"{archive.comments_count:>5} comments  {archive.size_bytes:>9} bytes  {archive.path}")
+        elif args.command == "restore":
+            async with AsyncSessionLocal() as db:
+                archive = await db.get(RunArchiveModel, args.run_id)
+                if archive is None:
+                    raise SystemExit(f"No archive of run {args.run_id}")
+                run = await restore_run(db, archive)
+            print(f"Restored run {run.id} ({run.name})")
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Archive expired runs, or list and restore archived ones.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sweep_parser = commands.add_parser("sweep", help="Archive the runs retention policies no longer keep")
+    sweep_parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE, help="Runs per transaction")
+    commands.add_parser("list", help="List archived runs")
+    restore_parser = commands.add_parser("restore", help="Restore an archived run")
+    restore_parser.add_argument("run_id")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,157 @@
+import functools
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Set
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from stream_agent.api.database import AsyncSessionLocal
+from stream_agent.api.jobs import job_queue, process_run, to_input_schema, QueueFullError
+from stream_agent.api.models import Subreddit as SubredditModel, Run as RunModel
+from stream_agent.api.periodic import PeriodicTask
+from stream_agent.api.persistence import new_run_name, run_in_progress
+from stream_agent.parser_agents.reddit.schemas import InputSchema
+
+logger = logging.getLogger(__name__)
+
+# Start due scheduled runs from this process; instances sharing a database claim each run once
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Seconds between checks for due subreddits
+SCHEDULER_POLL_INTERVAL = float(os.getenv("SCHEDULER_POLL_INTERVAL", "30"))
+# Scheduled runs processed at the same time, leaving the rest of the job queue to manual runs
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "2"))
+# Each interval is stretched or shrunk by up to this fraction so schedules drift apart
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+
+
+def first_run_at(schedule_minutes: Optional[int], now: Optional[datetime] = None) -> Optional[datetime]:
+    """When a newly scheduled subreddit first runs: somewhere within its first interval.
+
+    Spreading first runs keeps schedules created together, or on the hour, from firing together.
+    """
+    if schedule_minutes is None:
+        return None
+    now = now or datetime.utcnow()
+    return now + timedelta(minutes=schedule_minutes * random.random())
+
+
+def next_run_at(schedule_minutes: int, now: Optional[datetime] = None, jitter: float = SCHEDULER_JITTER) -> datetime:
+    """When a subreddit that runs now runs next, one jittered interval later."""
+    now = now or datetime.utcnow()
+    return now + timedelta(minutes=schedule_minutes * random.uniform(1 - jitter, 1 + jitter))
+
+
+class Scheduler(PeriodicTask):
+    """Starts runs of active subreddits whose schedule is due.
+
+    Due times live in the database, so a restart neither loses nor replays
+    schedules: however many runs were missed, a subreddit runs once and its
+    next run is one interval later. A subreddit with a run in progress waits
+    for it to finish, and at most `concurrency` scheduled runs are processed
+    at the same time. Due subreddits are claimed with a conditional update,
+    so instances sharing a database do not start the same run twice.
+    """
+
+    name = "scheduler"
+
+    def __init__(self, poll_interval: float = SCHEDULER_POLL_INTERVAL, concurrency: int = SCHEDULER_CONCURRENCY):
+        super().__init__(poll_interval)
+        self.concurrency = concurrency
+        self._running: Set[str] = set()  # Subreddits with a scheduled run being processed here
+
+    async def tick(self) -> int:
+        """Start the runs that are due and return how many were started."""
+        slots = self.concurrency - len(self._running)
+        if slots <= 0:
+            return 0
+
+        now = datetime.utcnow()
+        started = 0
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(SubredditModel)
+                .where(
+                    SubredditModel.active.is_(True),
+                    SubredditModel.schedule_minutes.is_not(None),
+                    SubredditModel.next_run_at <= now,
+                    SubredditModel.id.not_in(self._running),
+                    ~run_in_progress(SubredditModel.id)
+                )
+                .order_by(SubredditModel.next_run_at)
+                .limit(slots)
+            )
+            due = result.scalars().all()
+
+        # One session per subreddit, so a conflict rolls back only that subreddit's claim
+        for subreddit in due:
+            if not job_queue.has_room(1):
+                # Left due, so a later tick starts it
+                logger.warning(f"Job queue is full, postponing scheduled run of subreddit {subreddit.subreddit}")
+                break
+            missed = int((now - subreddit.next_run_at) / timedelta(minutes=subreddit.schedule_minutes))
+            run_id = str(uuid.uuid4())
+            async with AsyncSessionLocal() as db:
+                claimed = await db.execute(
+                    update(SubredditModel)
+                    .where(SubredditModel.id == subreddit.id, SubredditModel.next_run_at == subreddit.next_run_at)
+                    .values(next_run_at=next_run_at(subreddit.schedule_minutes, now)),
+                    execution_options={"synchronize_session": False}
+                )
+                if claimed.rowcount != 1:
+                    continue  # Started by another instance
+
+                db.add(RunModel(
+                    id=run_id,
+                    name=new_run_name(),
+                    subreddit_id=subreddit.id,
+                    owner_id=subreddit.owner_id,
+                    status="in_progress"
+                ))
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    # A run was started by hand since the select; it stays due for a later tick
+                    await db.rollback()
+                    logger.info(f"Skipped scheduled run of subreddit {subreddit.subreddit}, which has a run in progress")
+                    continue
+
+                input_schema = to_input_schema(subreddit)
+                try:
+                    job_queue.submit(functools.partial(self._process, subreddit.id, run_id, input_schema), run_id)
+                except QueueFullError:
+                    # Filled up by other requests since the check above; undo the claim for a later tick
+                    await db.execute(
+                        delete(RunModel).where(RunModel.id == run_id), execution_options={"synchronize_session": False}
+                    )
+                    await db.execute(
+                        update(SubredditModel)
+                        .where(SubredditModel.id == subreddit.id)
+                        .values(next_run_at=subreddit.next_run_at),
+                        execution_options={"synchronize_session": False}
+                    )
+                    await db.commit()
+                    logger.warning(f"Job queue is full, postponing scheduled run of subreddit {subreddit.subreddit}")
+                    break
+
+            self._running.add(subreddit.id)
+            started += 1
+            if missed:
+                logger.info(f"Coalesced {missed} missed runs of subreddit {subreddit.subreddit} into one")
+            logger.info(f"Started scheduled run {run_id} of subreddit {subreddit.subreddit}")
+        return started
+
+    async def _process(self, subreddit_id: str, run_id: str, input_schema: InputSchema):
+        try:
+            await process_run(run_id, input_schema)
+        finally:
+            self._running.discard(subreddit_id)
+
+    async def run_once(self):
+        await self.tick()
+
+
+scheduler = Scheduler()
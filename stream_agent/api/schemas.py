@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, List, Optional
 from pydantic import BaseModel, Field, EmailStr
 from stream_agent.common.schemas import DocumentCategory
 
@@ -18,6 +18,16 @@ class AIGeneratedComment(BaseModel):
     )
 
 
+
+class AIGeneratedCommentBatch(BaseModel):
+    """Schema for a batch of AI-generated comments."""
+
+    comments: List[AIGeneratedComment] = Field(
+        min_length=1,
+        max_length=1000,
+        description="Comments to add, each for a document owned by the current user",
+    )
+
 class SubredditConfig(BaseModel):
     """Configuration for a subreddit to be processed."""
 
@@ -28,9 +38,37 @@ class SubredditConfig(BaseModel):
     audience_specification: str = Field(description="Audience specification for content filtering")
     subreddit_description: str = Field(description="Description of the subreddit")
     active: bool = Field(default=True, description="Whether this subreddit is active for processing")
+    incremental: bool = Field(
+        default=False,
+        description="Whether runs skip expanding and ranking posts that earlier runs already ranked",
+    )
+    schedule_minutes: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Minutes between scheduled runs of an active subreddit; not scheduled when omitted",
+    )
+    retention_days: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Days after which runs are archived; kept indefinitely when omitted",
+    )
+    retention_runs: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Number of newest finished runs kept, older ones are archived; unlimited when omitted",
+    )
     created_at: datetime = Field(default_factory=datetime.now, description="When the subreddit was added")
 
 
+
+class ProcessAllRequest(BaseModel):
+    """Schema for processing several subreddits at once."""
+
+    subreddit_ids: Optional[List[str]] = Field(
+        default=None,
+        description="Subreddits to process; all of the current user's active subreddits when omitted",
+    )
+
 # Authentication Schemas
 class UserCreate(BaseModel):
     """Schema for user registration."""
@@ -0,0 +1,169 @@
+import re
+from typing import List
+
+from sqlalchemy import func, literal_column, select, table, column
+from sqlalchemy.engine import Connection, Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from stream_agent.api.models import Document as DocumentModel
+
+# Highlighting of matched terms in snippets
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 24
+
+# SQLite: FTS5 index over documents, reading the text from the documents table itself
+# and kept in sync by triggers. It is keyed by the documents rowid, so anything that
+# rebuilds the documents table (batch migrations, VACUUM) must call create_search_index
+# again, which re-creates the triggers and rebuilds the index. owner_id is indexed so
+# queries match it along with the terms and only ever rank one owner's documents; its
+# bm25 weight is 0 so it does not affect scores.
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+        title, content, owner_id, content='documents', content_rowid='rowid', tokenize='porter unicode61'
+    )""",
+    "INSERT INTO documents_fts(documents_fts, rank) VALUES ('rank', 'bm25(1.0, 1.0, 0.0)')",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, title, content, owner_id) VALUES (new.rowid, new.title, new.content, new.owner_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, title, content, owner_id)
+        VALUES ('delete', old.rowid, old.title, old.content, old.owner_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF title, content, owner_id ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, title, content, owner_id)
+        VALUES ('delete', old.rowid, old.title, old.content, old.owner_id);
+        INSERT INTO documents_fts(rowid, title, content, owner_id) VALUES (new.rowid, new.title, new.content, new.owner_id);
+    END""",
+    "INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')",
+]
+
+SQLITE_SEARCH_DROP = [
+    "DROP TRIGGER IF EXISTS documents_fts_update",
+    "DROP TRIGGER IF EXISTS documents_fts_delete",
+    "DROP TRIGGER IF EXISTS documents_fts_insert",
+    "DROP TABLE IF EXISTS documents_fts",
+]
+
+# Postgres: expression GIN index; queries must use exactly this expression to hit it
+POSTGRES_SEARCH_VECTOR = "to_tsvector('english', coalesce(documents.title, '') || ' ' || coalesce(documents.content, ''))"
+
+POSTGRES_SEARCH_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_documents_search ON documents USING gin ({POSTGRES_SEARCH_VECTOR})",
+]
+
+POSTGRES_SEARCH_DROP = [
+    "DROP INDEX IF EXISTS ix_documents_search",
+]
+
+# Database objects managed here rather than by the models, ignored by autogenerate
+SEARCH_OBJECT_PREFIXES = ("documents_fts", "ix_documents_search")
+
+
+def create_search_index(connection: Connection):
+    """Create the full-text index of documents for the connection's backend."""
+    ddl = {"sqlite": SQLITE_SEARCH_DDL, "postgresql": POSTGRES_SEARCH_DDL}.get(connection.dialect.name, [])
+    for statement in ddl:
+        connection.exec_driver_sql(statement)
+
+
+def drop_search_index(connection: Connection):
+    """Drop the full-text index of documents."""
+    ddl = {"sqlite": SQLITE_SEARCH_DROP, "postgresql": POSTGRES_SEARCH_DROP}.get(connection.dialect.name, [])
+    for statement in ddl:
+        connection.exec_driver_sql(statement)
+
+
+def _fts5_string(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def fts5_query(q: str) -> str:
+    """Turn free text into an FTS5 query that matches all of its terms.
+
+    Each term is quoted so user input can never be parsed as FTS5 syntax;
+    a trailing * keeps its meaning as a prefix search.
+    """
+    terms = []
+    for term in q.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if not re.search(r"\w", term):
+            continue
+        quoted = _fts5_string(term)
+        terms.append(quoted + "*" if prefix else quoted)
+    return " ".join(terms)
+
+
+def _sqlite_search(owner_id: str, q: str, limit: int, offset: int):
+    fts = table("documents_fts", column("rowid"), column("rank"))
+    # The owner term narrows the index to one owner before anything is ranked or snippeted
+    match = f"owner_id:{_fts5_string(owner_id)} AND {{title content}}:({fts5_query(q)})"
+    return (
+        select(
+            DocumentModel.id,
+            DocumentModel.title,
+            DocumentModel.url,
+            DocumentModel.run_id,
+            DocumentModel.created_at,
+            func.snippet(
+                literal_column("documents_fts"), -1, SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS
+            ).label("snippet"),
+            (-fts.c.rank).label("score"),
+        )
+        .select_from(fts.join(DocumentModel, literal_column("documents.rowid") == fts.c.rowid))
+        .where(
+            literal_column("documents_fts").op("MATCH")(match),
+            DocumentModel.owner_id == owner_id
+        )
+        .order_by(fts.c.rank)
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def _postgres_search(owner_id: str, q: str, limit: int, offset: int):
+    vector = literal_column(POSTGRES_SEARCH_VECTOR)
+    query = func.websearch_to_tsquery(literal_column("'english'"), q)
+
+    # Rank and page first, then build headlines for the page only
+    score = func.ts_rank(vector, query).label("score")
+    matches = (
+        select(DocumentModel.id, score)
+        .where(vector.op("@@")(query), DocumentModel.owner_id == owner_id)
+        .order_by(score.desc(), DocumentModel.id)
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    options = f"StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, FragmentDelimiter={SNIPPET_ELLIPSIS}, MaxWords={SNIPPET_TOKENS}, MinWords=8, MaxFragments=2"
+    return (
+        select(
+            DocumentModel.id,
+            DocumentModel.title,
+            DocumentModel.url,
+            DocumentModel.run_id,
+            DocumentModel.created_at,
+            func.ts_headline(literal_column("'english'"), DocumentModel.content, query, options).label("snippet"),
+            matches.c.score,
+        )
+        .join(matches, matches.c.id == DocumentModel.id)
+        .order_by(matches.c.score.desc(), DocumentModel.id)
+    )
+
+
+async def search_documents(db: AsyncSession, owner_id: str, q: str, limit: int, offset: int = 0) -> List[Row]:
+    """Rank the owner's documents matching q, best first, with highlighted snippets."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        if not fts5_query(q):
+            return []
+        stmt = _sqlite_search(owner_id, q, limit, offset)
+    elif dialect == "postgresql":
+        stmt = _postgres_search(owner_id, q, limit, offset)
+    else:
+        raise NotImplementedError(f"Full-text search is not supported on {dialect}")
+
+    result = await db.execute(stmt)
+    return result.all()
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+PERIODS = {"s": 1, "second": 1, "m": 60, "minute": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+
+@dataclass(frozen=True)
+class Rate:
+    """A token bucket holding up to `capacity` tokens and refilling `refill_per_second`."""
+    capacity: float
+    refill_per_second: float
+
+    @classmethod
+    def parse(cls, spec: str) -> Optional["Rate"]:
+        """Parse "<requests>/<period>", where period is a unit or a number of seconds. None means unlimited."""
+        spec = spec.strip().lower()
+        if spec in ("", "0"):
+            return None
+
+        match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)?\s*([a-z]*)", spec)
+        unit = match.group(3) if match else ""
+        if unit.endswith("s") and unit[:-1] in PERIODS:
+            unit = unit[:-1]
+        if not match or (unit and unit not in PERIODS) or not (unit or match.group(2)):
+            raise ValueError(f"Invalid rate limit {spec!r}, expected e.g. '20/hour' or '5/30s'")
+
+        requests = float(match.group(1))
+        seconds = float(match.group(2) or 1) * PERIODS.get(unit, 1)
+        if requests <= 0 or seconds <= 0:
+            return None
+        return cls(capacity=requests, refill_per_second=requests / seconds)
+
+
+# Maximum number of concurrent calls to each external provider, shared by every pipeline in the process
+PROVIDER_CONCURRENCY = {
+    "arcade": int(os.getenv("ARCADE_CONCURRENCY", "8")),
+    "llm": int(os.getenv("LLM_CONCURRENCY", "4")),
+}
+# Calls started per provider by this process, as "<requests>/<period>" (e.g. "60/minute");
+# a burst of the whole bucket may start at once, then calls wait for it to refill. Empty or 0 disables
+PROVIDER_RATE_LIMITS = {
+    "arcade": os.getenv("ARCADE_RATE_LIMIT", "300/minute"),
+    "llm": os.getenv("LLM_RATE_LIMIT", "60/minute"),
+}
+
+
+class ProviderLimit:
+    """Async context manager holding one of `concurrency` slots for a call to a provider.
+
+    Entering waits for a free slot and then, if `rate` is set, for a token of
+    the provider's bucket, so calls are both bounded in number and paced.
+    """
+
+    def __init__(self, concurrency: int, rate: Optional[Rate] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.clock = clock
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()  # Waiting callers take tokens in arrival order
+        self._tokens = rate.capacity if rate else 0.0
+        self._updated_at = clock()
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            await self._take()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._semaphore.release()
+
+    async def _take(self):
+        if self.rate is None:
+            return
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self._tokens = min(self.rate.capacity, self._tokens + (now - self._updated_at) * self.rate.refill_per_second)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate.refill_per_second)
+
+
+_limits: Dict[str, ProviderLimit] = {}
+
+
+def provider_slot(provider: str) -> ProviderLimit:
+    """Limit bounding concurrent calls to a provider and pacing them to its rate limit.
+
+    Usage:
+        async with provider_slot("llm"):
+            response = await agent.ainvoke(messages)
+    """
+    if provider not in _limits:
+        _limits[provider] = ProviderLimit(
+            PROVIDER_CONCURRENCY[provider], Rate.parse(PROVIDER_RATE_LIMITS.get(provider, ""))
+        )
+    return _limits[provider]
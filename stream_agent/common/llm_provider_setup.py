@@ -1,15 +1,47 @@
 # TODO(Mateo): This was take from Regis' code, we should probably move it to a monorepo
 """LLM provider setup and configuration using LangChain model factories."""
 
-from typing import Optional
+from typing import Any, Optional
 
 from dotenv import load_dotenv
 from langchain.chat_models import init_chat_model
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from stream_agent.common.metrics import LLM_REQUESTS, LLM_TOKENS
 
 # Load environment variables from .env file
 load_dotenv()
 
 
+class TokenUsageCallback(BaseCallbackHandler):
+    """Counts the requests and tokens of a chat model by provider and model."""
+
+    def __init__(self, provider: str, model: Optional[str]):
+        self.provider = provider
+        self.model = model or "default"
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any):
+        LLM_REQUESTS.labels(self.provider, self.model).inc()
+
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+
+        if not (input_tokens or output_tokens):
+            # Older integrations only report usage in llm_output
+            usage = (response.llm_output or {}).get("token_usage") or (response.llm_output or {}).get("usage") or {}
+            input_tokens = usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0
+            output_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+
+        LLM_TOKENS.labels(self.provider, self.model, "input").inc(input_tokens)
+        LLM_TOKENS.labels(self.provider, self.model, "output").inc(output_tokens)
+
+
 def get_llm(provider: str, model: Optional[str] = None, temperature: float = 0.7):
     """Get the appropriate LLM instance using LangChain's model factory.
 
@@ -34,5 +66,6 @@ def get_llm(provider: str, model: Optional[str] = None, temperature: float = 0.7
     # Use LangChain's model factory with automatic provider inference
     # The factory will handle API key loading automatically from environment variables
     return init_chat_model(
-        model=model, model_provider=provider, temperature=temperature
+        model=model, model_provider=provider, temperature=temperature,
+        callbacks=[TokenUsageCallback(provider, model)]
     )
\ No newline at end of file
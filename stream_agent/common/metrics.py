@@ -0,0 +1,29 @@
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+
+# Pipeline stages take from milliseconds (filtering) to minutes (expanding posts, ranking)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Time spent in each stage of the Reddit pipeline",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+LLM_REQUESTS = Counter(
+    "llm_requests_total",
+    "Completed LLM requests",
+    ["provider", "model"]
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens used by LLM requests, as reported by the provider",
+    ["provider", "model", "type"]
+)
+
+
+def observe_stage(stage: str, status: str, elapsed: Optional[float]):
+    """Stage callback recording how long each completed pipeline stage took."""
+    if status == "completed" and elapsed is not None:
+        PIPELINE_STAGE_SECONDS.labels(stage).observe(elapsed)
@@ -0,0 +1,28 @@
+import time
+from typing import Callable, Optional
+
+# Called with (stage, status, elapsed seconds); status is "started" or "completed"
+StageCallback = Callable[[str, str, Optional[float]], None]
+
+
+class StageTimer:
+    """Reports consecutive pipeline stages and how long each one took."""
+
+    def __init__(self, on_stage: Optional[StageCallback] = None):
+        self.on_stage = on_stage
+        self.stage: Optional[str] = None
+        self._started_at = 0.0
+
+    def enter(self, stage: str):
+        """Complete the current stage, if any, and start the next one."""
+        self.finish()
+        self.stage = stage
+        self._started_at = time.perf_counter()
+        if self.on_stage is not None:
+            self.on_stage(stage, "started", None)
+
+    def finish(self):
+        """Complete the current stage."""
+        if self.stage is not None and self.on_stage is not None:
+            self.on_stage(self.stage, "completed", time.perf_counter() - self._started_at)
+        self.stage = None
@@ -1,5 +1,7 @@
+import argparse
 import asyncio
 from datetime import datetime
+from typing import Optional
 import parser_agents.reddit.agent as reddit_agent
 import parser_agents.x.agent as x_agent
 import parser_agents.x.schemas as x_schemas
@@ -14,7 +16,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def main_reddit():
+async def persist_documents(owner: str, subreddit_name: str, documents):
+    """Save documents as a new run of the owner's configuration for the subreddit."""
+    from sqlalchemy import select
+    from stream_agent.api.database import AsyncSessionLocal
+    from stream_agent.api.models import User as UserModel, Subreddit as SubredditModel
+    from stream_agent.api.persistence import persist_run
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(SubredditModel).join(UserModel).where(
+            UserModel.username == owner,
+            SubredditModel.subreddit == subreddit_name
+        ))
+        subreddit = result.scalars().first()
+        if subreddit is None:
+            logger.warning(f"No {subreddit_name} subreddit configuration for user {owner}, not persisting")
+            return
+
+        run_id = await persist_run(db, subreddit.id, documents)
+        logger.info(f"Saved {len(documents)} documents for {subreddit_name} in run {run_id}")
+
+async def main_reddit(persist_for: Optional[str] = None):
     logger.info("Getting content for MCP subreddit")
 
     today = datetime.now().strftime("%Y-%m-%d")
@@ -57,6 +79,8 @@ async def main_reddit():
             )
             logger.info(f"Writing content for {subreddit.subreddit} subreddit")
             write_documents_to_json(content, f"output_data/{today}/reddit-{subreddit.subreddit}_content.json")
+            if persist_for:
+                await persist_documents(persist_for, subreddit.subreddit, content)
         except RuntimeError as e:
             logger.error(f"Error getting content for {subreddit.subreddit} subreddit: {e}")
 
@@ -77,4 +101,12 @@ async def main_x():
         except RuntimeError as e:
             logger.error(f"Error getting content for {topic.search_query} twitter: {e}")
 if __name__ == "__main__":
-    asyncio.run(main_reddit())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Collect content from the configured sources")
+    parser.add_argument(
+        "--persist-for",
+        metavar="USERNAME",
+        help="Also save each subreddit's documents as a new run of this user's matching subreddit configuration"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main_reddit(persist_for=args.persist_for))
\ No newline at end of file
@@ -1,13 +1,16 @@
 from stream_agent.common.partials import DOCUMENT_CATEGORY_PARTIAL
 from stream_agent.common.schemas import Document, DocumentCategory
 from stream_agent.common.utils import auth_tools
+from stream_agent.common.limits import provider_slot
+from stream_agent.common.progress import StageCallback, StageTimer
+from stream_agent.parser_agents.reddit.schemas import InputSchema, KnownPost
 from stream_agent.common.llm_provider_setup import get_llm
 from stream_agent.parser_agents.reddit.tools import (
     get_top_posts_metadata_in_subreddit,
     filter_posts, expand_posts, translate_items)
 import os
 from pydantic import BaseModel, Field, field_validator, model_validator, create_model
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from arcadepy import AsyncArcade
 from dotenv import load_dotenv
 import logging
@@ -16,14 +19,6 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-class InputSchema(BaseModel):
-    subreddit: str = Field(description="The subreddit to get content from")
-    time_range: str = Field(description="The time range to get content from")
-    limit: int = Field(description="The number of posts to get")
-    target_number: int = Field(description="The number of posts to return")
-    audience_specification: str = Field(description="The audience specification")
-    subreddit_description: str = Field(description="The description of the subreddit")
-
 def create_ranking_schema(post_ids: List[str]) -> type:
     """
     Create a dynamic Pydantic model where each post ID is a field name.
@@ -103,34 +98,24 @@ def extract_results_from_dynamic_response(response: Any, post_ids: List[str]) ->
 
     return ordered_ids, document_categories
 
-async def get_content(parser_agent_config: InputSchema) -> List[Document]:
-    client = AsyncArcade()
-    await auth_tools(
-        client=client,
-        user_id=os.getenv("USER_ID"),
-        tool_names=["Reddit.GetContentOfMultiplePosts",
-                    "Reddit.GetPostsInSubreddit"],
-        provider="reddit"
-    )
+def refresh_known_post(known_post: KnownPost, post: dict) -> Document:
+    """The saved document of a known post, with the engagement counts just fetched"""
+    document = known_post.document
+    metadata = {**document.metadata, "upvotes": post["upvotes"], "num_comments": post["num_comments"]}
+    return document.model_copy(update={"metadata": metadata})
 
-    logger.info(f"Getting top posts metadata in subreddit {parser_agent_config.subreddit}")
-    posts = await get_top_posts_metadata_in_subreddit(
-        client=client,
-        subreddit=parser_agent_config.subreddit,
-        time_range=parser_agent_config.time_range,
-        limit=parser_agent_config.limit
-    )
-    posts = await filter_posts(
-        posts=posts,
-        target_number=parser_agent_config.target_number
-    )
-
-    logger.info("Expanding posts...")
-    posts = await expand_posts(
-        client=client,
-        posts=posts
-    )
+def merge_rankings(documents: List[Document], known_documents: List[tuple]) -> List[Document]:
+    """
+    Merge newly ranked documents with (document, rank, ranked_with) of known posts.
+    Rankings of different runs are compared by relative position, new posts first on ties.
+    """
+    positions = [(index / len(documents), 0, document) for index, document in enumerate(documents)]
+    positions += [((rank - 1) / ranked_with, 1, document) for document, rank, ranked_with in known_documents]
+    positions.sort(key=lambda x: (x[0], x[1]))
+    return [document for _, _, document in positions]
 
+async def rank_posts(parser_agent_config: InputSchema, posts: List[dict]) -> tuple:
+    """Rank expanded posts with the LLM, returning ordered post IDs and their categories"""
     subreddit = parser_agent_config.subreddit
     subreddit_description = parser_agent_config.subreddit_description
     post_ids = [post['id'] for post in posts]
@@ -236,7 +221,8 @@ async def get_content(parser_agent_config: InputSchema) -> List[Document]:
     ids_before = [post["id"] for post in posts]
     logger.info(f"IDs before: {ids_before}")
 
-    response = agent.invoke([{"role": "system", "content": system_prompt}])
+    async with provider_slot("llm"):
+        response = await agent.ainvoke([{"role": "system", "content": system_prompt}])
 
     logger.info(f"Response received: {response}")
 
@@ -253,9 +239,75 @@ async def get_content(parser_agent_config: InputSchema) -> List[Document]:
         logger.warning("This is not expected, please investigate")
         raise RuntimeError("IDs before and after are different, this is not expected")
 
-    logger.info("Translating posts...")
-    return await translate_items(
+    return ordered_ids, document_categories
+
+async def get_content(
+    parser_agent_config: InputSchema,
+    on_stage: Optional[StageCallback] = None,
+    known_posts: Optional[Dict[str, KnownPost]] = None
+) -> List[Document]:
+    """
+    Get the best posts of a subreddit as documents, best first.
+    Posts in known_posts, by post ID, were ranked by an earlier run: they are
+    neither expanded nor ranked again, and keep their earlier ranking and category.
+    """
+    stages = StageTimer(on_stage)
+    known_posts = known_posts or {}
+
+    stages.enter("auth")
+    client = AsyncArcade()
+    await auth_tools(
+        client=client,
+        user_id=os.getenv("USER_ID"),
+        tool_names=["Reddit.GetContentOfMultiplePosts",
+                    "Reddit.GetPostsInSubreddit"],
+        provider="reddit"
+    )
+
+    stages.enter("fetch")
+    logger.info(f"Getting top posts metadata in subreddit {parser_agent_config.subreddit}")
+    posts = await get_top_posts_metadata_in_subreddit(
+        client=client,
+        subreddit=parser_agent_config.subreddit,
+        time_range=parser_agent_config.time_range,
+        limit=parser_agent_config.limit
+    )
+    stages.enter("filter")
+    posts = await filter_posts(
         posts=posts,
-        ordered_ids=ordered_ids,
-        document_categories=document_categories
+        target_number=parser_agent_config.target_number
     )
+
+    # Only posts no earlier run has seen are expanded and ranked
+    new_posts = [post for post in posts if post['id'] not in known_posts]
+    seen_posts = [post for post in posts if post['id'] in known_posts]
+    if known_posts:
+        logger.info(f"Reusing the ranking of {len(seen_posts)} known posts, {len(new_posts)} new posts")
+
+    documents = []
+    if new_posts:
+        stages.enter("expand")
+        logger.info("Expanding posts...")
+        new_posts = await expand_posts(
+            client=client,
+            posts=new_posts
+        )
+
+        stages.enter("rank")
+        ordered_ids, document_categories = await rank_posts(parser_agent_config, new_posts)
+
+        stages.enter("translate")
+        logger.info("Translating posts...")
+        documents = await translate_items(
+            posts=new_posts,
+            ordered_ids=ordered_ids,
+            document_categories=document_categories
+        )
+
+    if seen_posts:
+        documents = merge_rankings(documents, [
+            (refresh_known_post(known_posts[post['id']], post), known_posts[post['id']].rank, known_posts[post['id']].ranked_with)
+            for post in seen_posts
+        ])
+    stages.finish()
+    return documents
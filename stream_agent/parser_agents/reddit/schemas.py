@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+
+from stream_agent.common.schemas import Document
+
+
+class InputSchema(BaseModel):
+    subreddit: str = Field(description="The subreddit to get content from")
+    time_range: str = Field(description="The time range to get content from")
+    limit: int = Field(description="The number of posts to get")
+    target_number: int = Field(description="The number of posts to return")
+    audience_specification: str = Field(description="The audience specification")
+    subreddit_description: str = Field(description="The description of the subreddit")
+
+class KnownPost(BaseModel):
+    document: Document = Field(description="The document saved for the post, with its category")
+    rank: int = Field(description="The rank the post was given (1=best)")
+    ranked_with: int = Field(description="The number of posts it was ranked with")
@@ -1,12 +1,25 @@
-from arcadepy import AsyncArcade
 from datetime import datetime
 import os
-from typing import List
+from typing import TYPE_CHECKING, List
+from stream_agent.common.limits import provider_slot
 from stream_agent.common.schemas import Document, DocumentType, DocumentCategory, ContentType
 
+if TYPE_CHECKING:
+    # Only for annotations, so the API can use this module without loading the Arcade client
+    from arcadepy import AsyncArcade
+
+# How far back each listing time range reaches, in seconds; ALL_TIME has no limit
+TIME_RANGE_SECONDS = {
+    "NOW": 60 * 60,
+    "TODAY": 24 * 60 * 60,
+    "THIS_WEEK": 7 * 24 * 60 * 60,
+    "THIS_MONTH": 31 * 24 * 60 * 60,
+    "THIS_YEAR": 366 * 24 * 60 * 60,
+}
+
 
 async def get_top_posts_metadata_in_subreddit(
-    client: AsyncArcade,
+    client: "AsyncArcade",
     subreddit: str,
     time_range: str = "TODAY",
     limit: int = 100,
@@ -23,11 +36,12 @@ async def get_top_posts_metadata_in_subreddit(
         if cursor is not None:
             tool_input["cursor"] = cursor
 
-        return await client.tools.execute(
-            tool_name="Reddit.GetPostsInSubreddit",
-            input=tool_input,
-            user_id=os.getenv("USER_ID"),
-        )
+        async with provider_slot("arcade"):
+            return await client.tools.execute(
+                tool_name="Reddit.GetPostsInSubreddit",
+                input=tool_input,
+                user_id=os.getenv("USER_ID"),
+            )
 
     posts = []
 
@@ -69,7 +83,7 @@ async def filter_posts(
 
 
 async def expand_posts(
-    client: AsyncArcade,
+    client: "AsyncArcade",
     posts: List[dict]
 ) -> List[dict]:
     """
@@ -80,11 +94,12 @@ async def expand_posts(
         "post_identifiers": [post["id"] for post in posts],
     }
 
-    expanded_posts = await client.tools.execute(
-        tool_name="Reddit.GetContentOfMultiplePosts",
-        input=tool_input,
-        user_id=os.getenv("USER_ID"),
-    )
+    async with provider_slot("arcade"):
+        expanded_posts = await client.tools.execute(
+            tool_name="Reddit.GetContentOfMultiplePosts",
+            input=tool_input,
+            user_id=os.getenv("USER_ID"),
+        )
 
     return expanded_posts.output.value["posts"]
 
@@ -95,15 +110,13 @@ async def translate_items(
     document_categories: List[DocumentCategory],
 ) -> List[Document]:
     """
-    Translate posts to documents.
+    Translate posts to documents, in ranking order.
     """
     documents = []
-    post_id_to_category = {post_id: category
-                           for post_id, category in
-                           zip(ordered_ids, document_categories)}
+    post_id_to_post = {post["id"]: post for post in posts}
 
-    for post in posts:
-        document_category = post_id_to_category[post["id"]]
+    for post_id, document_category in zip(ordered_ids, document_categories):
+        post = post_id_to_post[post_id]
         documents.append(Document(
             url=f'https://www.reddit.com{post["permalink"]}',
             type=ContentType.REDDIT,
@@ -114,6 +127,7 @@ async def translate_items(
             date_published=datetime.fromtimestamp(post["created_utc"]),
             content=post["body"],
             metadata={
+                "post_id": post["id"],
                 "subreddit": post["subreddit"],
                 "upvotes": post["upvotes"],
                 "num_comments": post["num_comments"],